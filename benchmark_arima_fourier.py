@@ -0,0 +1,50 @@
+from importers import uq
+from predictors.arima_model import ARIMAModel
+from evaluation.error_terms import nrmse
+import pandas as pd
+import warnings
+import time
+
+# compares the seasonal ARIMA with s=24 to non-seasonal ARIMA models with Fourier terms for the daily cycle
+data = uq.load('data/uq/power/car_park_1/2014.csv', 'data/uq/weather/2014.csv')
+filter = ['airtemp', 'humidity']
+order = (2,0,1)
+configurations = [
+    ['seasonal (2,0,1,24)', {'order': order, 'seasonal_order': (2,0,1,24)}],
+    ['fourier K=2', {'order': order, 'fourier_terms': 2}],
+    ['fourier K=4', {'order': order, 'fourier_terms': 4}],
+    ['fourier K=6', {'order': order, 'fourier_terms': 6}],
+]
+datestrings = [
+    ['jan', ['20140104', '20140131', '20140201', '20140202']],
+    ['apr', ['20140403', '20140430', '20140501', '20140502']],
+    ['jul', ['20140704', '20140731', '20140801', '20140802']],
+    ['oct', ['20141004', '20141031', '20141101', '20141102']],
+]
+
+rows = []
+print('--------------------------------')
+print(f'using filter: {filter}')
+print('--------------------------------')
+print()
+
+for month, [training_start, training_end, testing_start, testing_end] in datestrings:
+    training = data[training_start:training_end]
+    testing = data[testing_start:testing_end]
+    for name, params in configurations:
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            model = ARIMAModel(scaling=True)
+            start = time.perf_counter()
+            model.fit(training, filter=filter, **params)
+            fit_seconds = round(time.perf_counter() - start, 3)
+            prediction = model.predict(testing_data=testing)
+        error = nrmse(testing.power, prediction.power)
+        print(f'{month}, {name}: fit in {fit_seconds}s, nRMSE: {error}')
+        rows.append({'month': month, 'configuration': name, 'fit_seconds': fit_seconds, 'nrmse': error})
+
+df = pd.DataFrame(rows)
+print()
+print(df.to_string(index=False))
+print()
+print(df.groupby('configuration')[['fit_seconds', 'nrmse']].mean().round(3).to_string())
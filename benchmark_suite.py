@@ -0,0 +1,261 @@
+from importers import uq, pvwatts, synthetic
+from features import solar
+from predictors.arima_model import ARIMAModel
+from predictors.svr_model import SVRModel
+import instrumentation
+from datetime import datetime
+import multiprocessing
+import pandas as pd
+import numpy as np
+import tracemalloc
+import platform
+import argparse
+import warnings
+import tempfile
+import time
+import json
+import sys
+import os
+
+# benchmarks the importers, fits and predictions on synthetic data at several sizes, e.g.
+#   python benchmark_suite.py run --output out/benchmarks/baseline.json
+#   python benchmark_suite.py run --output out/benchmarks/current.json
+#   python benchmark_suite.py compare out/benchmarks/baseline.json out/benchmarks/current.json
+SIZES = {'week': 7 * 24, 'month': 30 * 24, 'year': 365 * 24, 'multi_year': 3 * 365 * 24} # hours
+SITES = [1, 10, 100]
+QUICK = ['week', 'month', '1_site', '10_sites'] # labels run with --quick
+FILTER = ['airtemp', 'humidity']
+START = '20130101'
+NOISE_FLOOR = {'wall_seconds': 0.005, 'peak_rss_mb': 5, 'allocated_peak_mb': 1} # smaller differences are never regressions
+
+def hourly_data(hours, site=0, start=START):
+    """
+    Hourly data of a synthetic site in the layout of 'uq.load', see 'synthetic.generate'
+    """
+    return synthetic.site(site, start=start, hours=hours)
+
+def uq_files(directory, hours, sites):
+    """
+    Writes minute resolution UQ power files of 'sites' synthetic sites sharing the weather file of the first one
+
+    returns: the weather file and the list of power files
+    """
+    prefix = os.path.join(directory, f'uq_{hours}')
+    weather_file = f'{prefix}_weather.csv'
+    power_files = [f'{prefix}_power_{site}.csv' for site in range(sites)]
+    for site, power_file in enumerate(power_files):
+        if os.path.exists(power_file) and (site or os.path.exists(weather_file)): continue
+        synthetic.write_uq_files(hourly_data(hours, site), power_file, None if site else weather_file)
+    return weather_file, power_files
+
+def pvwatts_json(hours, site=0):
+    """
+    Response of the PVWatts API for a synthetic site
+    """
+    return synthetic.pvwatts_response(synthetic.site(site, hours=hours, layout='pvwatts'))
+
+def _uq_load(directory, hours, sites):
+    weather_file, power_files = uq_files(directory, hours, sites)
+    def run():
+        uq._read_weather.cache_clear() # every repeat parses the shared weather file once, like a new process
+        for power_file in power_files: uq.load(power_file, weather_file, use_cache=False)
+    return run
+
+def _json_to_dataframe(directory, hours, sites):
+    responses = [pvwatts_json(hours, site) for site in range(sites)]
+    return lambda: [pvwatts.json_to_dataframe(response) for response in responses]
+
+def _generate(directory, hours, sites):
+    return lambda: list(synthetic.generate(sites, hours=hours))
+
+def _solar(function):
+    def setup(directory, hours, sites):
+        index = pd.date_range(START, periods=hours, freq='H')
+        random = np.random.default_rng(0)
+        latitude, longitude = random.uniform(-45, 55, sites), random.uniform(-180, 180, sites)
+        return lambda: function(index, latitude, longitude)
+    return setup
+
+def _arima_fit(params):
+    def setup(directory, hours, sites):
+        data = hourly_data(hours)
+        return lambda: ARIMAModel().fit(data, filter=FILTER, **params)
+    return setup
+
+def _arima_predict(directory, hours, sites):
+    model = ARIMAModel()
+    model.fit(hourly_data(SIZES['month']), order=(2,0,1), fourier_terms=4, filter=FILTER)
+    testing = [hourly_data(hours, site, start=model.training_data.index[-1] + pd.Timedelta(hours=1)) for site in range(sites)]
+    return lambda: [model.predict(testing_data=data) for data in testing]
+
+def _svr_fit(directory, hours, sites):
+    data = hourly_data(hours)
+    return lambda: SVRModel(data).fit(data, filter=FILTER)
+
+def _svr_predict(directory, hours, sites):
+    model = SVRModel(hourly_data(SIZES['year']))
+    model.fit(hourly_data(SIZES['month']), filter=FILTER)
+    testing = [hourly_data(hours, site) for site in range(sites)]
+    return lambda: [model.predict(data) for data in testing]
+
+def cases():
+    """
+    All benchmarks as dicts with 'name', 'entry', 'hours', 'sites', 'repeats' and 'setup'. Every setup
+    gets the fixture directory, hours and sites and returns the function that is measured.
+    Fits are benchmarked on one site at the sizes they are used with, exact SVR and seasonal ARIMA
+    fits are quadratic in the amount of hours and left out for longer ranges.
+    """
+    benchmarks = []
+    def add(entry, setup, sizes=(), sites=(), repeats=3, hours_with_sites='month'):
+        for size in sizes:
+            benchmarks.append({'name': f'{entry}[{size}]', 'entry': entry, 'hours': SIZES[size], 'sites': 1,
+                               'repeats': repeats, 'setup': setup, 'labels': [size]})
+        for amount in sites:
+            label = '1_site' if amount == 1 else f'{amount}_sites'
+            benchmarks.append({'name': f'{entry}[{hours_with_sites},{label}]', 'entry': entry, 'hours': SIZES[hours_with_sites],
+                               'sites': amount, 'repeats': repeats, 'setup': setup, 'labels': [hours_with_sites, label]})
+
+    add('uq.load', _uq_load, sizes=SIZES, sites=SITES[1:], repeats=1)
+    add('pvwatts.json_to_dataframe', _json_to_dataframe, sizes=['week', 'month', 'year'], sites=SITES[1:], hours_with_sites='year')
+    add('synthetic.generate', _generate, sites=SITES[1:], hours_with_sites='year')
+    add('solar.clear_sky', _solar(solar.clear_sky), sizes=SIZES, sites=SITES[1:] + [1000], hours_with_sites='year')
+    add('solar.solar_features', _solar(solar.solar_features), sites=[1, 1000], hours_with_sites='year')
+    add('ARIMAModel.fit', _arima_fit({'order': (2,0,1), 'seasonal_order': (2,0,1,24)}), sizes=['week', 'month'], repeats=1)
+    add('ARIMAModel.fit_fourier', _arima_fit({'order': (2,0,1), 'fourier_terms': 4}), sizes=SIZES, repeats=1)
+    add('ARIMAModel.predict', _arima_predict, sizes=['week', 'month', 'year'], sites=SITES, hours_with_sites='week')
+    add('SVRModel.fit', _svr_fit, sizes=['week', 'month', 'year'], repeats=1)
+    add('SVRModel.predict', _svr_predict, sizes=SIZES, sites=SITES, hours_with_sites='week')
+    return benchmarks
+
+def measure(case, directory, repeats=None):
+    """
+    Runs a benchmark and measures the wall time of every repeat, the peak resident set size during
+    the repeats and the memory allocated by one extra run traced with tracemalloc
+
+    returns: a dict with the results
+    """
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        run = case['setup'](directory, case['hours'], case['sites'])
+        if (repeats or case['repeats']) > 1: run() # warm up caches, fits are too slow to run once more
+        reset = instrumentation.reset_peak_rss()
+        times = []
+        for _ in range(repeats or case['repeats']):
+            start = time.perf_counter()
+            run()
+            times.append(time.perf_counter() - start)
+        peak_rss = instrumentation.peak_rss_mb(reset) # includes the setup if the peak could not be reset
+        tracemalloc.start()
+        run()
+        allocated, allocated_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return {'name': case['name'], 'entry': case['entry'], 'hours': case['hours'], 'sites': case['sites'], 'repeats': len(times),
+            'wall_seconds': float(np.median(times)), 'wall_min_seconds': min(times), 'peak_rss_mb': round(peak_rss, 1) if peak_rss is not None else None,
+            'allocated_peak_mb': round(allocated_peak / 2**20, 3), 'allocated_mb': round(allocated / 2**20, 3)}
+
+def _measure_in_child(case, directory, repeats, connection):
+    try:
+        connection.send(measure(case, directory, repeats))
+    except Exception as error:
+        connection.send({'name': case['name'], 'error': f'{type(error).__name__}: {error}'})
+    connection.close()
+
+def _versions():
+    versions = {'python': platform.python_version()}
+    for name in ['numpy', 'pandas', 'sklearn', 'statsmodels', 'pmdarima', 'scipy']:
+        try:
+            versions[name] = __import__(name).__version__
+        except ImportError:
+            versions[name] = None
+    return versions
+
+def run(output, names=None, quick=False, repeats=None, fixtures=None):
+    """
+    Runs the benchmarks, every one in a new process so the peak memory of one does not affect the others,
+    and writes the results to 'output' as json
+
+    names: list. Only run benchmarks whose name contains one of these strings (optional). default = all
+    quick: Boolean. Only run the week and month sizes and up to 10 sites (optional). default = False
+    repeats: int. Timed repeats per benchmark, overrides the defaults of the cases (optional)
+    fixtures: str. Directory for the fixture files, kept between runs (optional). default = a temporary directory
+    """
+    selected = [case for case in cases() if (not names or any(name in case['name'] for name in names))
+                and (not quick or all(label in QUICK for label in case['labels']))]
+    directory = fixtures or tempfile.mkdtemp(prefix='benchmark_fixtures_')
+    os.makedirs(directory, exist_ok=True)
+    context = multiprocessing.get_context('fork')
+    results = []
+    for case in selected:
+        receiver, sender = context.Pipe(duplex=False)
+        process = context.Process(target=_measure_in_child, args=(case, directory, repeats, sender))
+        process.start()
+        sender.close()
+        try:
+            result = receiver.recv()
+        except EOFError:
+            result = {'name': case['name'], 'error': f'benchmark process exited with code {process.exitcode}'}
+        process.join()
+        results.append(result)
+        if 'error' in result: print(f"{case['name']:<45} failed: {result['error']}")
+        else:
+            rss = 'unknown' if result['peak_rss_mb'] is None else f"{result['peak_rss_mb']:.1f}"
+            print(f"{case['name']:<45} {result['wall_seconds']:>9.4f} s {rss:>9} MB rss {result['allocated_peak_mb']:>9.2f} MB allocated")
+
+    report = {'created': datetime.now().isoformat(), 'machine': platform.platform(), 'cpus': os.cpu_count(),
+              'versions': _versions(), 'results': results}
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as file:
+        json.dump(report, file, indent=2)
+    print(f'saved {len(results)} results to {output}')
+    return report
+
+def compare(baseline, current, threshold=0.2, metrics=('wall_seconds', 'peak_rss_mb', 'allocated_peak_mb')):
+    """
+    Compares two result files of 'run'. A metric regressed if it grew by more than 'threshold'
+    relative to the baseline and by more than its NOISE_FLOOR.
+
+    threshold: float. Allowed relative increase, e.g. 0.2 for 20 % (optional). default = 0.2
+
+    returns: a DataFrame with one row per benchmark and metric and a 'regression' column
+    """
+    with open(baseline) as file: baseline_results = {result['name']: result for result in json.load(file)['results']}
+    with open(current) as file: current_results = {result['name']: result for result in json.load(file)['results']}
+    rows = []
+    for name, result in current_results.items():
+        before = baseline_results.get(name)
+        if before is None or 'error' in before or 'error' in result: continue
+        for metric in metrics:
+            if result[metric] is None or before[metric] is None: continue # the peak memory is not known on windows
+            change = result[metric] - before[metric]
+            ratio = result[metric] / before[metric] if before[metric] else np.nan
+            rows.append({'benchmark': name, 'metric': metric, 'baseline': before[metric], 'current': result[metric],
+                         'ratio': round(ratio, 3), 'regression': change > NOISE_FLOOR[metric] and not ratio <= 1 + threshold})
+    missing = sorted(set(baseline_results) - set(current_results))
+    failed = sorted(name for name, result in current_results.items() if 'error' in result)
+    if missing: print(f'not in the current results: {", ".join(missing)}')
+    if failed: print(f'failed: {", ".join(failed)}')
+    return pd.DataFrame(rows, columns=['benchmark', 'metric', 'baseline', 'current', 'ratio', 'regression'])
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmarks importers, fits and predictions on synthetic data')
+    commands = parser.add_subparsers(dest='command', required=True)
+    run_parser = commands.add_parser('run', help='run the benchmarks and write the results as json')
+    run_parser.add_argument('--output', default=f'out/benchmarks/{datetime.now():%Y%m%d_%H%M%S}.json', help='json file for the results')
+    run_parser.add_argument('--only', nargs='+', default=None, help='only run benchmarks whose name contains one of these strings')
+    run_parser.add_argument('--quick', action='store_true', help='only run the week and month sizes and up to 10 sites')
+    run_parser.add_argument('--repeats', type=int, default=None, help='timed repeats per benchmark')
+    run_parser.add_argument('--fixtures', default=None, help='directory for the fixture files, reused by later runs')
+    compare_parser = commands.add_parser('compare', help='flag regressions of a result file against a baseline')
+    compare_parser.add_argument('baseline', help='json results of the baseline')
+    compare_parser.add_argument('current', help='json results to check')
+    compare_parser.add_argument('--threshold', type=float, default=0.2, help='allowed relative increase, default: 0.2')
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        run(args.output, names=args.only, quick=args.quick, repeats=args.repeats, fixtures=args.fixtures)
+    else:
+        comparison = compare(args.baseline, args.current, threshold=args.threshold)
+        print(comparison.to_string(index=False))
+        regressions = comparison[comparison.regression]
+        print(f'{len(regressions)} regressions in {regressions.benchmark.nunique()} benchmarks')
+        sys.exit(1 if len(regressions) else 0)
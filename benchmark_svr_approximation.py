@@ -0,0 +1,39 @@
+from importers import uq
+from predictors.svr_model import SVRModel
+from evaluation.error_terms import nrmse
+import pandas as pd
+import warnings
+import time
+
+# compares the exact SVR with the kernel approximations on growing training windows
+data = pd.concat([
+    uq.load('data/uq/power/car_park_1/2013.csv', 'data/uq/weather/2013.csv'),
+    uq.load('data/uq/power/car_park_1/2014.csv', 'data/uq/weather/2014.csv'),
+])
+filter = ['airtemp', 'humidity']
+testing_start, testing_end = '20141201', '20141202'
+testing = data[testing_start:testing_end]
+training_end = pd.Timestamp(testing_start) - pd.Timedelta(hours=1)
+
+rows = []
+print('--------------------------------')
+print(f'testing on {testing_start} - {testing_end}')
+print('--------------------------------')
+print()
+
+for months in [1, 3, 12]:
+    training = data[training_end - pd.DateOffset(months=months) + pd.Timedelta(hours=1):training_end]
+    for approximation in [None, 'nystroem', 'fourier']:
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore') # convergence warnings of the stochastic gradient descent
+            svr = SVRModel(data, scaling=True)
+            start = time.perf_counter()
+            svr.fit(training, filter=filter, approximation=approximation)
+            fit_seconds = round(time.perf_counter() - start, 3)
+        error = nrmse(testing.power, svr.predict(testing).power)
+        name = approximation or 'exact'
+        print(f'{months} months ({len(training)} hours), {name}: fit in {fit_seconds}s, nRMSE: {error}')
+        rows.append({'months': months, 'approximation': name, 'hours': len(training), 'fit_seconds': fit_seconds, 'nrmse': error})
+
+print()
+print(pd.DataFrame(rows).to_string(index=False))
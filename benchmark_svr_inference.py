@@ -0,0 +1,41 @@
+from importers import uq
+from predictors.svr_model import SVRModel
+from predictors.compiled_svr import compile_svr
+import pandas as pd
+import numpy as np
+import time
+
+# compares the prediction throughput of the SVRModel with the compiled NumPy predictor
+data = uq.load('data/uq/power/car_park_1/2014.csv', 'data/uq/weather/2014.csv')
+filter = ['airtemp', 'humidity']
+training = data['20140301':'20140531']
+testing = data['20140601':'20141231']
+repeats = 5
+
+svr = SVRModel(data, scaling=True)
+svr.fit(training, filter=filter)
+compiled = compile_svr(svr)
+
+print('--------------------------------')
+print(f'{len(svr.model.support_vectors_)} support vectors, {len(testing)} testing hours')
+difference = np.abs(compiled.predict(testing).to_numpy() - svr.predict(testing).power.to_numpy()).max()
+print(f'largest difference to sklearn: {difference} W')
+print('--------------------------------')
+print()
+
+def throughput(predict, rows):
+    start = time.perf_counter()
+    for _ in range(repeats): predict()
+    return round(repeats * rows / (time.perf_counter() - start))
+
+values = testing[compiled.features].to_numpy(dtype=float)
+rows = [
+    {'predictor': 'SVRModel.predict', 'rows_per_second': throughput(lambda: svr.predict(testing), len(testing))},
+    {'predictor': 'CompiledSVR.predict', 'rows_per_second': throughput(lambda: compiled.predict(testing), len(testing))},
+    {'predictor': 'CompiledSVR.predict_values', 'rows_per_second': throughput(lambda: compiled.predict_values(values), len(values))},
+]
+for block_size in [256, 1024, 4096]:
+    blocked = compile_svr(svr, block_size=block_size)
+    rows.append({'predictor': f'CompiledSVR.predict_values (block_size={block_size})', 'rows_per_second': throughput(lambda: blocked.predict_values(values), len(values))})
+
+print(pd.DataFrame(rows).to_string(index=False))
@@ -0,0 +1,156 @@
+from evaluation.error_terms import BOUNDS
+import pandas as pd
+import numpy as np
+
+def _group_stats(groups, y_true, y_pred, size):
+    """
+    count, mean of the truth, squared deviations of the truth from its mean and mean squared and
+    absolute error per group, computed for all groups at once. groups are integer codes below 'size'.
+    """
+    count = np.bincount(groups, minlength=size)
+    occupied = np.maximum(count, 1)
+    errors = y_true - y_pred
+    true_mean = np.bincount(groups, y_true, minlength=size) / occupied
+    deviations = y_true - true_mean[groups]
+    true_m2 = np.bincount(groups, deviations * deviations, minlength=size)
+    squared_error_mean = np.bincount(groups, errors * errors, minlength=size) / occupied
+    absolute_error_mean = np.bincount(groups, np.abs(errors), minlength=size) / occupied
+    return count, true_mean, true_m2, squared_error_mean, absolute_error_mean
+
+def _valid(y_true, y_pred):
+    y_true = np.asarray(y_true, dtype=float).ravel()
+    y_pred = np.asarray(y_pred, dtype=float).ravel()
+    valid = np.isfinite(y_true) & np.isfinite(y_pred)
+    return valid, y_true[valid], y_pred[valid]
+
+class ErrorAccumulator:
+    """
+    -----------------------------
+    ###### Error Accumulator ######
+    -----------------------------
+
+    Running mse, rmse, nrmse, mae and r2 over predictions that arrive in chunks, without keeping them.
+    Means and the squared deviations of the truth are combined with the pairwise update of Welford and Chan,
+    so accumulators of different chunks or workers can be merged in any order and give the same errors
+    as calculating them over the complete series. NaN values are left out.
+    """
+    def __init__(self):
+        self.count = 0
+        self.true_mean = 0.0
+        self.true_m2 = 0.0 # sum of squared deviations of the truth from its mean
+        self.squared_error_mean = 0.0
+        self.absolute_error_mean = 0.0
+
+    def update(self, y_true, y_pred):
+        """
+        Adds a chunk of predictions
+
+        y_true: array or Series. Expected values
+        y_pred: array or Series. Predicted values
+        """
+        _, y_true, y_pred = _valid(y_true, y_pred)
+        stats = _group_stats(np.zeros(len(y_true), dtype=np.intp), y_true, y_pred, 1)
+        self._combine(*(values[0] for values in stats))
+        return self
+
+    def merge(self, other):
+        """
+        Adds the predictions accumulated by another ErrorAccumulator
+        """
+        self._combine(other.count, other.true_mean, other.true_m2, other.squared_error_mean, other.absolute_error_mean)
+        return self
+
+    def _combine(self, count, true_mean, true_m2, squared_error_mean, absolute_error_mean):
+        if count == 0: return
+        total = self.count + count
+        weight = count / total
+        delta = true_mean - self.true_mean
+        self.true_m2 += true_m2 + delta * delta * self.count * weight
+        self.true_mean += delta * weight
+        self.squared_error_mean += (squared_error_mean - self.squared_error_mean) * weight
+        self.absolute_error_mean += (absolute_error_mean - self.absolute_error_mean) * weight
+        self.count = total
+
+    def errors(self, decimals=None, bounds=BOUNDS):
+        """
+        Errors of all accumulated predictions, same definitions as 'error_terms.batch_errors'
+
+        decimals: int. Round the results, e.g. 2 (optional). default = not rounded
+        bounds: float. nrmse and r2 values beyond +-bounds are NaN (optional). default = 3
+
+        returns: a dict with 'mse', 'rmse', 'nrmse', 'mae', 'r2' and 'count'
+        """
+        if self.count == 0:
+            return {'mse': np.nan, 'rmse': np.nan, 'nrmse': np.nan, 'mae': np.nan, 'r2': np.nan, 'count': 0}
+        mse = self.squared_error_mean
+        rmse = np.sqrt(mse)
+        squared_errors = mse * self.count
+        if self.true_m2 == 0: r2 = 1.0 if squared_errors == 0 else 0.0
+        else: r2 = 1 - squared_errors / self.true_m2
+        nrmse = rmse / self.true_mean if self.true_mean != 0 else np.nan
+        results = {'mse': mse, 'rmse': rmse, 'nrmse': nrmse, 'mae': self.absolute_error_mean, 'r2': r2}
+        if decimals is not None: results = {name: round(value, decimals) for name, value in results.items()}
+        for name in ['nrmse', 'r2']:
+            if not np.isfinite(results[name]) or abs(results[name]) > bounds: results[name] = np.nan
+        results['count'] = self.count
+        return results
+
+class BacktestAccumulator:
+    """
+    -----------------------------
+    ###### Backtest Accumulator ######
+    -----------------------------
+
+    ErrorAccumulators for all predictions together and broken down per site, per month and per hour of the day.
+    Update it with every forecast chunk of a rolling backtest, merge the accumulators of parallel workers
+    and get all errors with 'summary'.
+    """
+    def __init__(self):
+        self.total = ErrorAccumulator()
+        self.sites = {}
+        self.months = {month: ErrorAccumulator() for month in range(1, 13)}
+        self.hours = {hour: ErrorAccumulator() for hour in range(24)}
+
+    def update(self, site, y_true, y_pred):
+        """
+        Adds a chunk of predictions of a site
+
+        site: str. Name of the site, e.g. 'stl_2014'
+        y_true: Series. Expected values indexed by time
+        y_pred: Series or array. Predicted values for the same hours
+        """
+        valid, true_values, predicted = _valid(y_true, y_pred)
+        index = y_true.index[valid]
+        self.total.update(true_values, predicted)
+        self.sites.setdefault(site, ErrorAccumulator()).update(true_values, predicted)
+        for breakdown, codes, size, offset in [(self.months, index.month.values - 1, 12, 1), (self.hours, index.hour.values, 24, 0)]:
+            stats = _group_stats(codes, true_values, predicted, size)
+            for code in np.flatnonzero(stats[0]):
+                breakdown[code + offset]._combine(*(values[code] for values in stats))
+        return self
+
+    def merge(self, other):
+        """
+        Adds the predictions accumulated by another BacktestAccumulator, e.g. of another worker
+        """
+        self.total.merge(other.total)
+        for site, accumulator in other.sites.items(): self.sites.setdefault(site, ErrorAccumulator()).merge(accumulator)
+        for month, accumulator in other.months.items(): self.months[month].merge(accumulator)
+        for hour, accumulator in other.hours.items(): self.hours[hour].merge(accumulator)
+        return self
+
+    def summary(self, decimals=None, bounds=BOUNDS):
+        """
+        returns: a DataFrame indexed by (breakdown, key), e.g. ('total', 'all'), ('site', 'stl_2014'),
+                 ('month', 1) or ('hour', 12), with the columns mse, rmse, nrmse, mae, r2 and count.
+                 Months and hours without predictions are left out
+        """
+        rows, keys = [], []
+        groups = [('total', {'all': self.total}), ('site', self.sites), ('month', self.months), ('hour', self.hours)]
+        for breakdown, accumulators in groups:
+            for key, accumulator in accumulators.items():
+                if accumulator.count == 0 and breakdown != 'total': continue
+                keys.append((breakdown, key))
+                rows.append(accumulator.errors(decimals, bounds))
+        return pd.DataFrame(rows, index=pd.MultiIndex.from_tuples(keys, names=['breakdown', 'key']),
+                            columns=['mse', 'rmse', 'nrmse', 'mae', 'r2', 'count'])
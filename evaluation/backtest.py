@@ -0,0 +1,250 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from predictors.arima_model import ARIMAModel
+from predictors.svr_model import SVRModel
+from evaluation.error_terms import mse, rmse, nrmse, r2
+from importers.store import DatasetStore
+from evaluation.results_store import task_key
+import instrumentation
+import pandas as pd
+import numpy as np
+import multiprocessing
+import warnings
+import os
+
+try:
+    from threadpoolctl import threadpool_limits
+except ImportError:
+    threadpool_limits = None
+
+def arima_forecast(training, testing, data, order=None, seasonal_order=None, filter=None, use_exogenous=True, previous=None, fourier_terms=None):
+    """
+    Fits an ARIMAModel on the training window and predicts the testing window
+
+    training: DataFrame. Training window
+    testing: DataFrame. Testing window
+    data: DataFrame. The whole dataset the windows were cut from (unused)
+    previous: ARIMAModel. Model of the previous window, its parameters are the start parameters of the fit (optional)
+    fourier_terms: int. Harmonic pairs modelling the daily cycle instead of a seasonal order (optional)
+
+    returns: the fitted model and the prediction
+    """
+    model = ARIMAModel(scaling=True)
+    model.fit(training, order=order, seasonal_order=seasonal_order, filter=filter, use_exogenous=use_exogenous,
+              start_params=previous, fourier_terms=fourier_terms)
+    if use_exogenous: return model, model.predict(testing_data=testing)
+    return model, model.predict(hours=len(testing))
+
+def arima_auto_forecast(training, testing, data, p=(1,3), q=(1,3), P=(1,3), Q=(1,3), d=None, D=None, filter=None, use_exogenous=True, workers=None):
+    """
+    Searches the ARIMA orders with ARIMAModel.fit_auto on the training window and predicts the testing window
+
+    training: DataFrame. Training window
+    testing: DataFrame. Testing window
+    data: DataFrame. The whole dataset the windows were cut from (unused)
+    p, q, P, Q, d, D, workers: passed to ARIMAModel.fit_auto
+
+    returns: the fitted model and the prediction
+    """
+    model = ARIMAModel(scaling=True)
+    model.fit_auto(training, p=tuple(p), q=tuple(q), P=tuple(P), Q=tuple(Q), d=d, D=D, trace=False, filter=filter,
+                   use_exogenous=use_exogenous, workers=workers)
+    if use_exogenous: return model, model.predict(testing_data=testing)
+    return model, model.predict(hours=len(testing))
+
+def svr_forecast(training, testing, data, filter=None, **params):
+    """
+    Fits an SVRModel on the training window and predicts the testing window.
+    The whole dataset is used as base data for the scaler.
+
+    training: DataFrame. Training window
+    testing: DataFrame. Testing window
+    data: DataFrame. The whole dataset the windows were cut from
+    params: further keyword arguments passed to SVRModel.fit (kernel, C, gamma, epsilon)
+
+    returns: the fitted model and the prediction
+    """
+    model = SVRModel(data, scaling=True)
+    model.fit(training, filter=filter, **params)
+    return model, model.predict(testing)
+
+WARM_START = ['arima'] # forecasters that take the model of the previous window as 'previous'
+
+FORECASTERS = {
+    'arima': arima_forecast,
+    'arima_auto': arima_auto_forecast,
+    'svr': svr_forecast,
+}
+
+METRICS = {
+    'mse': mse,
+    'rmse': rmse,
+    'nrmse': nrmse,
+    'r2': r2,
+}
+
+_datasets = None
+_bases = None
+
+def _init_worker(datasets, bases=None):
+    global _datasets, _bases
+    _datasets = datasets
+    _bases = bases
+    if threadpool_limits is not None: threadpool_limits(1) # one BLAS thread per worker, the pool provides the parallelism
+
+def _window(dataset, start, end):
+    if isinstance(_datasets, DatasetStore): return _datasets.frame(dataset, start, end) # view into the shared mapping
+    return _datasets[dataset][start:end]
+
+def _run_cell(dataset, window, dates, name, spec, previous=None, metrics=('nrmse', 'r2')):
+    data = _bases[dataset] if _bases is not None and dataset in _bases else _datasets[dataset]
+    training_start, training_end, testing_start, testing_end = dates
+    training = _window(dataset, training_start, training_end)
+    testing = _window(dataset, testing_start, testing_end)
+
+    params = dict(spec)
+    forecast = FORECASTERS[params.pop('model')]
+    if params.pop('warm_start', False): params['previous'] = previous
+    with warnings.catch_warnings(), instrumentation.stage('cell', site=dataset, window=window, model=name) as cell:
+        warnings.filterwarnings('error', message='divide by zero encountered in double_scalars')
+        try:
+            model, prediction = forecast(training, testing, data, **params)
+            fit = {'fit_time': getattr(model, 'fit_time', None), 'iterations': getattr(model, 'fit_iterations', None)}
+            with instrumentation.stage('metrics'):
+                errors = {metric: METRICS[metric](testing.power, prediction.power) for metric in metrics}
+            return (errors, None, fit), model
+        except Exception as e:
+            cell.record(failed=True, error=str(e))
+            return (None, str(e), None), None
+
+def _run_chain(chain, metrics=('nrmse', 'r2')):
+    """
+    Runs cells one after the other. With 'warm_start' in the spec, every fit starts from the
+    model of the last successful cell before it.
+    """
+    results = []
+    previous = None
+    for cell in chain:
+        result, model = _run_cell(*cell, previous=previous, metrics=metrics)
+        if model is not None: previous = model
+        results.append(result)
+    return results
+
+def cells(datasets, windows, models):
+    """
+    Expands datasets, windows and models into the list of independent backtest cells
+
+    returns: list of (dataset, window, dates, model name, model spec) tuples
+    """
+    result = []
+    for dataset in datasets.keys():
+        dataset_windows = windows[dataset] if isinstance(windows, dict) else windows
+        for window, dates in dataset_windows:
+            for name, spec in models.items():
+                result.append((dataset, window, dates, name, spec))
+    return result
+
+def chains(tasks):
+    """
+    Groups cells into the units of work of a backtest. Cells of a model with 'warm_start' depend on the
+    previous window of the same dataset, so they form one chain per dataset and model in window order.
+    All other cells are independent chains of one cell.
+
+    raises: ValueError if a model that cannot be warm started has 'warm_start'
+    """
+    result = []
+    warm = {}
+    for task in tasks:
+        dataset, _, _, name, spec = task
+        if spec.get('warm_start'):
+            if spec['model'] not in WARM_START: raise ValueError(f"model '{name}' has warm_start, which is only supported by {WARM_START}")
+            if (dataset, name) not in warm:
+                warm[(dataset, name)] = []
+                result.append(warm[(dataset, name)])
+            warm[(dataset, name)].append(task)
+        else:
+            result.append([task])
+    return result
+
+def run(datasets, windows, models, workers=None, verbose=True, fit_log=None, metrics=('nrmse', 'r2'), bases=None, store=None, on_result=None):
+    """
+    Runs a backtest: every model is fit and evaluated on every window of every dataset.
+    All (dataset, window, model) cells are independent and are spread over a process pool.
+
+    datasets: dict. Maps a dataset name (e.g. 'stl_2012' or a city) to a DataFrame. Can also be a DatasetStore,
+                    then the workers share the memory-mapped values and windows are cut as views
+    windows: list. Windows in the form [name, [training_start, training_end, testing_start, testing_end]]
+             like the 'datestrings' tables of the run scripts. Pass a dict mapping each dataset name
+             to such a list if the windows differ per dataset
+    models: dict. Maps a model name to its spec. A spec is a dict with the key 'model' naming one of
+            the FORECASTERS ('arima', 'arima_auto', 'svr'), all other keys are passed to the forecaster,
+            e.g. {'model': 'arima', 'order': (2,0,1), 'seasonal_order': (2,0,1,24), 'filter': ['airtemp']}.
+            With 'warm_start': True, an ARIMA fit starts from the parameters fit on the previous window of the same dataset,
+            the windows of a dataset are then fit one after the other
+    workers: int. Amount of worker processes (optional). default = amount of cpu cores.
+                  With 1 worker all cells are run in the current process
+    verbose: Boolean. Whether results should be printed as they come in (optional). default = True
+    fit_log: list. If passed, a dict with the cell, model, fit time in seconds and optimizer iterations of every
+                   successful cell is appended to it, e.g. to compare warm started fits (optional). default = None
+    metrics: list. Names of the METRICS to calculate for every cell (optional). default = ('nrmse', 'r2')
+    bases: dict. Maps dataset names to the data passed to the forecasters as whole dataset instead of the dataset
+                 itself, e.g. the previous year as base data for the scaler of the SVR (optional). default = None
+    store: ResultsStore. Every finished cell is stored in it right away. Cells already in the store (also failed ones)
+                         are not run again but taken from the store, so an interrupted run can be resumed.
+                         A warm started chain resumed in the middle starts cold (optional). default = None
+    on_result: function. Called with the result DataFrame after every finished cell, e.g. to save intermediate
+                         results (optional). default = None
+
+    returns: a DataFrame indexed by '<dataset>_<window>' with the columns '<metric>_<model>', e.g. 'nrmse_arima'
+    """
+    tasks = cells(datasets, windows, models)
+    index = list(dict.fromkeys(f'{dataset}_{window}' for dataset, window, _, _, _ in tasks))
+    columns = [f'{metric}_{name}' for name in models.keys() for metric in metrics]
+    df = pd.DataFrame(index=index, columns=columns, dtype=np.float64)
+    if workers is None: workers = os.cpu_count()
+
+    def collect(task, result, stored=False):
+        dataset, window, _, name, _ = task
+        errors, error, fit = result
+        cell = f'{dataset}_{window}'
+        if store is not None and not stored: store.append(task_key(*task, metrics), dataset, window, name, errors, error, fit)
+        if error is None:
+            for metric, value in errors.items(): df.loc[cell, f'{metric}_{name}'] = value
+            if fit_log is not None: fit_log.append({'cell': cell, 'model': name, **fit})
+            timing = f" (fit in {round(fit['fit_time'], 3)}s, {fit['iterations']} iterations)" if fit['fit_time'] is not None else ''
+            if verbose: print(f"{cell} {name}: {'; '.join(f'{metric}: {value}' for metric, value in errors.items())}{timing}")
+        elif verbose:
+            print(f'ERROR: {error}. Leaving out {cell} for {name}')
+        if on_result is not None: on_result(df)
+
+    if store is not None:
+        records = store.records()
+        remaining = []
+        for task in tasks:
+            record = records.get(task_key(*task, metrics))
+            if record is None: remaining.append(task)
+            else: collect(task, (record['errors'], record['error'], record['fit']), stored=True)
+        if verbose and len(remaining) < len(tasks): print(f'resuming: {len(tasks) - len(remaining)} of {len(tasks)} cells are already stored')
+        tasks = remaining
+
+    units = chains(tasks)
+    if workers == 1:
+        global _datasets, _bases
+        _datasets, _bases = datasets, bases
+        for chain in units:
+            for task, result in zip(chain, _run_chain(chain, metrics)): collect(task, result)
+    else:
+        # forked workers inherit the datasets instead of unpickling them and do not re-run the calling script
+        context = multiprocessing.get_context('fork') if 'fork' in multiprocessing.get_all_start_methods() else None
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker, initargs=(datasets, bases)) as executor:
+            futures = {executor.submit(_run_chain, chain, metrics): chain for chain in units}
+            for future in as_completed(futures):
+                for task, result in zip(futures[future], future.result()): collect(task, result)
+    return df
+
+def quantiles(df):
+    """
+    Summarizes a backtest result with its quantiles and the average of each column
+    """
+    qt = df.quantile([0, 0.25, 0.5, 0.75, 1]).round(2)
+    qt.loc['average'] = df.mean().round(2)
+    return qt
@@ -1,5 +1,6 @@
 from math import sqrt
 from sklearn.metrics import mean_squared_error, r2_score
+import numpy as np
 
 def mse(y_true, y_pred):
     """
@@ -46,3 +47,47 @@ def r2(y_true, y_pred):
     result = round(r2_score(y_true, y_pred), 2)
     if result > 3 or result < -3: raise RuntimeError(f'error r2 {result} out of bounds')
     return result
+
+BOUNDS = 3 # nrmse and r2 values beyond +-BOUNDS are considered failed predictions
+
+def batch_errors(y_true, y_pred, decimals=None, bounds=BOUNDS):
+    """
+    calculates mse, rmse, nrmse, mae and r2 for many predictions at once. The arrays can have
+    any amount of leading dimensions (e.g. sites x months x models), the errors are calculated
+    over the last one (the hours). NaN values in either array are left out, so predictions of
+    different lengths can be stacked by padding them with NaN.
+    Instead of raising an error, nrmse and r2 values out of bounds are NaN. The r2 of a constant
+    truth is 1 for a perfect prediction and 0 otherwise, as in the r2_score of sklearn.
+
+    y_true: array. Expected values
+    y_pred: array. Predicted values, same shape as y_true
+    decimals: int. Round the results like the single series functions, e.g. 2 (optional). default = not rounded
+    bounds: float. nrmse and r2 values beyond +-bounds are NaN (optional). default = 3
+
+    returns: a dict mapping 'mse', 'rmse', 'nrmse', 'mae' and 'r2' to arrays of the leading shape, or to floats
+             if y_true and y_pred are a single series
+    """
+    y_true = np.asarray(y_true, dtype=float)
+    y_pred = np.asarray(y_pred, dtype=float)
+    valid = np.isfinite(y_true) & np.isfinite(y_pred)
+    count = valid.sum(axis=-1)
+    residuals = np.where(valid, y_true - y_pred, 0)
+    squared_errors = (residuals * residuals).sum(axis=-1)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = np.where(valid, y_true, 0).sum(axis=-1) / count
+        deviations = np.where(valid, y_true - mean[..., np.newaxis], 0)
+        total = (deviations * deviations).sum(axis=-1)
+        mse = squared_errors / count
+        rmse = np.sqrt(mse)
+        r2 = np.where(total == 0, np.where(squared_errors == 0, 1.0, 0.0), 1 - squared_errors / total)
+        r2[count == 0] = np.nan
+        results = {'mse': mse, 'rmse': rmse, 'nrmse': rmse / mean, 'mae': np.abs(residuals).sum(axis=-1) / count, 'r2': r2}
+
+    if decimals is not None: results = {name: np.round(values, decimals) for name, values in results.items()}
+    for name in ['nrmse', 'r2']:
+        values = results[name]
+        with np.errstate(invalid='ignore'):
+            results[name] = np.where(np.isfinite(values) & (np.abs(values) <= bounds), values, np.nan)
+    if np.ndim(count) == 0: return {name: float(values) for name, values in results.items()}
+    return {name: np.asarray(values) for name, values in results.items()}
@@ -0,0 +1,216 @@
+from importers import uq, pvwatts
+from evaluation import backtest
+from evaluation.results_store import ResultsStore
+import instrumentation
+from features import solar
+from datetime import datetime
+import pandas as pd
+import json
+import time
+import os
+
+MONTHS = ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec']
+TUPLES = ['order', 'seasonal_order', 'p', 'q', 'P', 'Q'] # model arguments that have to be tuples
+
+def load_spec(filepath):
+    """
+    Reads an experiment spec from a json file, see the files in 'experiments' for examples.
+
+    A spec has the keys
+    name: str. Name of the experiment
+    output: str. Directory for the results
+    datasets: list. Dataset entries, see 'load_datasets'
+    windows: dict or list. Arguments of 'monthly_windows' or explicit windows [name, [training_start, training_end, testing_start, testing_end]]
+    features: list. Filter used by all models, or a list of filters to run every model with each of them (optional)
+    models: dict. Maps model names to backtest model specs, see 'backtest.run'
+    metrics: list. Names of the backtest METRICS (optional). default = ['nrmse', 'r2']
+    workers: int. Amount of worker processes (optional). default = amount of cpu cores
+    """
+    with open(filepath) as file:
+        spec = json.load(file)
+    missing = [key for key in ['name', 'output', 'datasets', 'windows', 'models'] if key not in spec]
+    if missing: raise ValueError(f'{filepath} is missing the keys {", ".join(missing)}')
+    return spec
+
+def monthly_windows(data, training_days=28, testing_days=2, months=None):
+    """
+    Generates one window per month of the year the data starts in: the model is trained on the last
+    'training_days' days of the month and tested on the first 'testing_days' days of the next month.
+    Windows whose testing days would lie after the end of the data are shifted back to end with it,
+    e.g. for december the testing days are the last days of the year.
+
+    data: DataFrame. Dataset with an hourly time index
+    training_days: int. Days of training data (optional). default = 28
+    testing_days: int. Days of testing data (optional). default = 2
+    months: list. Names of the months to generate windows for, e.g. ['jan', 'jul'] (optional). default = all months
+
+    returns: list of windows in the form [name, [training_start, training_end, testing_start, testing_end]]
+    """
+    year = data.index[0].year
+    last_day = data.index[len(data)-1].normalize()
+    windows = []
+    for position, name in enumerate(MONTHS):
+        if months is not None and name not in months: continue
+        testing_start = pd.Timestamp(year, position + 1, 1) + pd.DateOffset(months=1)
+        testing_end = testing_start + pd.Timedelta(days=testing_days - 1)
+        if testing_end > last_day:
+            testing_start -= testing_end - last_day
+            testing_end = last_day
+        training_end = testing_start - pd.Timedelta(days=1)
+        training_start = training_end - pd.Timedelta(days=training_days - 1)
+        dates = [date.strftime('%Y%m%d') for date in [training_start, training_end, testing_start, testing_end]]
+        windows.append([name, dates])
+    return windows
+
+def _years(entry):
+    years = entry.get('years')
+    if years is None: return [None]
+    return years
+
+def _add_solar_features(entry, data):
+    """
+    Adds the solar features of the 'solar' setting of a dataset entry. It is true or a dict with the
+    arguments of 'solar.add_solar_features', uq datasets default to the location of 'uq.LOCATION'.
+    """
+    settings = entry.get('solar')
+    if not settings: return data
+    settings = {**(uq.LOCATION if entry['importer'] == 'uq' else {}), **(settings if isinstance(settings, dict) else {})}
+    if 'latitude' not in settings or 'longitude' not in settings:
+        raise ValueError(f"the solar features of '{entry.get('name')}' need a latitude and longitude")
+    return solar.add_solar_features(data, **settings)
+
+def load_datasets(entries):
+    """
+    Loads the datasets of a spec. Every entry names an importer and its arguments:
+    {'importer': 'uq', 'name': 'stl_{year}', 'power_file': '.../{year}.csv', 'weather_file': '.../{year}.csv', 'years': [2012, 2013]}
+    {'importer': 'pvwatts_json', 'name': 'london', 'filepath': 'data/pvwatts/london.json'}
+    {'importer': 'pvwatts_city', 'name': 'berlin', 'filepath': 'data/pvwatts/station_export.csv', 'city': 'Berlin'}
+    {'importer': 'pvwatts_list', 'filepath': 'data/pvwatts/stations_list.csv', 'range': [0, 50]}
+    With 'years', one dataset per year is loaded and '{year}' and '{previous_year}' are replaced in all strings.
+    A uq entry can name other files as 'base' ({'power_file': ..., 'weather_file': ...}), their data is used as
+    base data of the models instead of the dataset itself.
+    With 'solar', the solar features are added to the datasets and their base data, e.g. 'solar': true for uq
+    entries or 'solar': {'latitude': 51.5, 'longitude': -0.1, 'utc_offset': 0, 'features': ['clear_sky']}.
+
+    returns: a dict mapping dataset names to DataFrames and a dict mapping dataset names to their base data
+    """
+    datasets, bases = {}, {}
+    for entry in entries:
+        for year in _years(entry):
+            def fill(value):
+                if not isinstance(value, str) or year is None: return value
+                return value.format(year=year, previous_year=year - 1)
+
+            importer = entry['importer']
+            if importer == 'uq':
+                name = fill(entry['name'])
+                datasets[name] = _add_solar_features(entry, uq.load(fill(entry['power_file']), fill(entry['weather_file'])))
+                if 'base' in entry: bases[name] = _add_solar_features(entry, uq.load(fill(entry['base']['power_file']), fill(entry['base']['weather_file'])))
+            elif importer == 'pvwatts_json':
+                datasets[fill(entry['name'])] = _add_solar_features(entry, pvwatts.load_from_json(fill(entry['filepath'])))
+            elif importer == 'pvwatts_city':
+                datasets[fill(entry['name'])] = _add_solar_features(entry, pvwatts.load_city_from_list(fill(entry['filepath']), entry['city']))
+            elif importer == 'pvwatts_list':
+                if entry.get('solar'): raise ValueError('solar features need one location per entry, list the cities as pvwatts_city entries')
+                datasets.update(pvwatts.bulk_load_from_list(fill(entry['filepath']), range=entry.get('range')))
+            else:
+                raise ValueError(f"unknown importer '{importer}'")
+    return datasets, bases
+
+def expand_models(models, features=None):
+    """
+    Turns the models of a spec into backtest model specs. 'features' is used as filter of every model
+    that uses exogenous variables and has no own filter. If 'features' is a list of filters, every such
+    model is run once per filter and named '<model>_<features joined by _>'.
+    """
+    sweep = bool(features) and isinstance(features[0], list)
+    result = {}
+    for name, spec in models.items():
+        spec = {key: tuple(value) if key in TUPLES else value for key, value in spec.items()}
+        if 'filter' in spec or not spec.get('use_exogenous', True) or not features:
+            result[name] = spec
+        elif sweep:
+            for filter in features: result[f"{name}_{'_'.join(filter)}"] = {**spec, 'filter': filter}
+        else:
+            result[name] = {**spec, 'filter': features}
+    return result
+
+def prepare(spec):
+    """
+    Expands a spec into the arguments of 'backtest.run'
+
+    returns: datasets, windows (dict mapping dataset names to their windows), models and bases
+    """
+    datasets, bases = load_datasets(spec['datasets'])
+    if isinstance(spec['windows'], list):
+        windows = {name: spec['windows'] for name in datasets.keys()}
+    else:
+        windows = {name: monthly_windows(data, **spec['windows']) for name, data in datasets.items()}
+    return datasets, windows, expand_models(spec['models'], spec.get('features')), bases
+
+def _write_csv(df, path, **kwargs):
+    temporary = f'{path}.tmp'
+    df.to_csv(temporary, **kwargs)
+    os.replace(temporary, path) # readers never see a half written file
+
+def run(spec, workers=None, verbose=True, resume=True, save_every=60, timings=False):
+    """
+    Runs an experiment: loads its datasets, generates the windows, runs the backtest in parallel and
+    saves full.csv (all cells), quantiles.csv and fits.csv (fit times) to the output directory of the spec.
+    Every finished cell is appended to results.jsonl in the output directory right away, an interrupted
+    run continues with the missing cells when it is started again. full.csv and quantiles.csv are updated
+    while the experiment runs.
+
+    spec: dict. Experiment spec, see 'load_spec'
+    workers: int. Amount of worker processes, overrides the spec (optional). default = spec or amount of cpu cores
+    resume: Boolean. Whether cells stored by an earlier run should be skipped, otherwise the stored results are
+                     discarded (optional). default = True
+    save_every: float. Seconds between updates of full.csv and quantiles.csv while running (optional). default = 60
+    timings: Boolean. Whether the stages of every cell should be recorded in timings.jsonl in the output directory,
+                      the slowest cells are printed at the end, see 'instrumentation.summary' (optional). default = False
+
+    returns: the DataFrame of all cells
+    """
+    if workers is None: workers = spec.get('workers')
+    output = spec['output']
+    os.makedirs(output, exist_ok=True)
+    if timings: instrumentation.enable(os.path.join(output, 'timings.jsonl'))
+    datasets, windows, models, bases = prepare(spec)
+    results = os.path.join(output, 'results.jsonl')
+    if not resume and os.path.exists(results): os.remove(results)
+    store = ResultsStore(results)
+
+    print('--------------------------------')
+    print(f"experiment {spec['name']} started at {datetime.now()}")
+    print(f'{len(datasets)} datasets, {sum(len(dataset_windows) for dataset_windows in windows.values())} windows, models: {", ".join(models.keys())}')
+    print(f'results are stored in {results}')
+    print('--------------------------------')
+    print()
+
+    last_save = [time.monotonic()]
+    def save(df, force=False):
+        if not force and time.monotonic() - last_save[0] < save_every: return
+        _write_csv(df, os.path.join(output, 'full.csv'))
+        _write_csv(backtest.quantiles(df), os.path.join(output, 'quantiles.csv'))
+        last_save[0] = time.monotonic()
+
+    fits = []
+    df = backtest.run(datasets, windows, models, workers=workers, verbose=verbose, fit_log=fits,
+                      metrics=spec.get('metrics', ['nrmse', 'r2']), bases=bases, store=store, on_result=save)
+    print()
+
+    save(df, force=True)
+    _write_csv(pd.DataFrame(fits), os.path.join(output, 'fits.csv'), index=False)
+    print('--------------------------------')
+    print(f'saved full.csv, quantiles.csv and fits.csv to {output}')
+    print(f'run finished at {datetime.now()}')
+    print('--------------------------------')
+    if timings:
+        instrumentation.disable()
+        stages, slowest = instrumentation.summary(os.path.join(output, 'timings.jsonl'))
+        print()
+        print(stages.round(3).to_string())
+        print()
+        print('slowest cells:')
+        print(slowest.round(3).to_string())
+    return df
@@ -0,0 +1,77 @@
+from datetime import datetime
+import pandas as pd
+import hashlib
+import json
+import os
+
+def task_key(dataset, window, dates, name, spec, metrics):
+    """
+    Hash of everything that determines the result of a backtest cell: the dataset and window names, the dates,
+    the model name and spec and the metrics. The data itself is not part of the key, use a new store if it changes.
+    """
+    task = [dataset, window, list(dates), name, spec, list(metrics)]
+    return hashlib.sha256(json.dumps(task, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+class ResultsStore:
+    """
+    ----------------------------
+    ###### Results Store ######
+    ----------------------------
+
+    Durable store for the results of backtest cells. Every result is appended as one json line and
+    flushed to disk before the next cell is stored, so a crashed run keeps all finished cells and
+    can be resumed by skipping the cells already in the store. A line cut off by a crash is ignored.
+
+    path: str. jsonl file of the store, created if it does not exist
+    """
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            with open(path, 'rb+') as file: # start a new line if the last write of a crashed run was cut off
+                file.seek(-1, os.SEEK_END)
+                if file.read(1) != b'\n': file.write(b'\n')
+
+    def records(self):
+        """
+        returns: a dict mapping task keys to their latest record
+        """
+        records = {}
+        if not os.path.exists(self.path): return records
+        with open(self.path) as file:
+            for line in file:
+                try:
+                    record = json.loads(line)
+                except ValueError: # incomplete last line of a crashed run
+                    continue
+                records[record['key']] = record
+        return records
+
+    def append(self, key, dataset, window, name, errors, error=None, fit=None):
+        """
+        Stores the result of a cell durably
+
+        key: str. Task key, see 'task_key'
+        errors: dict. Metric values of the cell, None if it failed
+        error: str. Error message if the cell failed (optional)
+        fit: dict. Fit time and iterations (optional)
+        """
+        record = {'key': key, 'dataset': dataset, 'window': window, 'model': name, 'errors': errors, 'error': error,
+                  'fit': fit, 'finished': datetime.now().isoformat()}
+        line = json.dumps(record, default=float) + '\n'
+        with open(self.path, 'a') as file:
+            file.write(line)
+            file.flush()
+            os.fsync(file.fileno())
+
+    def frame(self):
+        """
+        returns: the successful results as DataFrame indexed by '<dataset>_<window>' with the columns '<metric>_<model>'
+        """
+        columns = {}
+        for record in self.records().values():
+            if record['errors'] is None: continue
+            for metric, value in record['errors'].items():
+                columns.setdefault(f"{metric}_{record['model']}", {})[f"{record['dataset']}_{record['window']}"] = value
+        return pd.DataFrame(columns)
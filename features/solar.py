@@ -0,0 +1,205 @@
+import numpy as np
+
+SOLAR_CONSTANT = 1361 # W/m^2 at the mean distance between earth and sun
+FEATURES = ['solar_zenith', 'solar_azimuth', 'extraterrestrial', 'clear_sky']
+
+def _spencer(angle):
+    """
+    Equation of time in minutes, declination in radians and eccentricity correction of the earth's orbit
+    for the day angle 2 pi (day of the year - 1) / 365, after the Fourier series of Spencer
+    """
+    cos1, sin1 = np.cos(angle), np.sin(angle)
+    cos2, sin2 = cos1 * cos1 - sin1 * sin1, 2 * sin1 * cos1 # the harmonics from the angle sum identities
+    cos3, sin3 = cos1 * cos2 - sin1 * sin2, sin1 * cos2 + cos1 * sin2
+    equation_of_time = 229.18 * (0.000075 + 0.001868 * cos1 - 0.032077 * sin1 - 0.014615 * cos2 - 0.040849 * sin2)
+    declination = (0.006918 - 0.399912 * cos1 + 0.070257 * sin1 - 0.006758 * cos2 + 0.000907 * sin2
+                   - 0.002697 * cos3 + 0.00148 * sin3)
+    eccentricity = 1.00011 + 0.034221 * cos1 + 0.00128 * sin1 + 0.000719 * cos2 + 0.000077 * sin2
+    return equation_of_time, declination, eccentricity
+
+def _day_angle(index, utc_offset, shift):
+    """
+    Day angle of every hour in UTC and the minutes since local midnight, a time zone aware index is converted to UTC
+    """
+    if index.tz is not None:
+        index = index.tz_convert('UTC').tz_localize(None)
+        utc_offset = np.zeros(np.shape(utc_offset))
+    minutes = index.hour.values * 60 + index.minute.values + shift * 60
+    days = index.dayofyear.values - 1 + (minutes - np.asarray(utc_offset, dtype=float)[..., np.newaxis] * 60) / 1440
+    return 2 * np.pi * days / 365, minutes
+
+def _year_terms(index, offsets, shift):
+    """
+    Equation of time, sine and cosine of the declination and eccentricity correction as groups x hours arrays for
+    the utc offsets of the groups, and the minutes since local midnight. The series of Spencer is evaluated once on
+    the quarter hours of the year, at most 37000 values for any amount of sites and years, and looked up for the
+    UTC time of every group and hour rounded to a quarter hour.
+    """
+    if index.tz is not None:
+        index = index.tz_convert('UTC').tz_localize(None)
+        offsets = np.zeros_like(offsets)
+    minutes = index.hour.values * 60 + index.minute.values + shift * 60
+    quarters = np.round(((index.dayofyear.values - 1) * 1440 + minutes) / 15).astype(np.int64)
+    quarters = quarters[np.newaxis, :] - np.round(offsets * 4).astype(np.int64)[:, np.newaxis]
+    first = quarters.min()
+    quarters -= first
+    equation_of_time, declination, eccentricity = _spencer(2 * np.pi * (first + np.arange(quarters.max() + 1)) / (365 * 96))
+    grid = [equation_of_time, np.sin(declination), np.cos(declination), eccentricity]
+    return [values[quarters] for values in grid], minutes
+
+def _geometry(index, latitude, longitude, utc_offset, shift):
+    """
+    The hour angle of a site is an angle a of the hour, the same for all sites with the same utc offset, minus an
+    angle b of the site. With cos(a - b) = cos a cos b + sin a sin b the cosine of the zenith and the terms of the
+    azimuth are sums of three products of a site and an hour term, so no trigonometric function is evaluated per
+    site and hour. The hour terms are evaluated once per quarter hour of utc offset instead of once per site, and
+    the declination at the UTC time rounded to a quarter hour, which changes it by less than 0.003 degrees.
+
+    returns: the group of every site, its latitude in radians, cos b and sin b, a groups x 3 x hours array of
+             sin(declination), cos(declination) cos a and cos(declination) sin a and the eccentricity correction
+             as groups x hours array
+    """
+    latitude, longitude = np.broadcast_arrays(np.atleast_1d(np.asarray(latitude, dtype=float)), np.atleast_1d(np.asarray(longitude, dtype=float)))
+    if index.tz is not None: utc_offset = 0
+    elif utc_offset is None: utc_offset = longitude / 15
+    utc_offset = np.broadcast_to(np.asarray(utc_offset, dtype=float), longitude.shape)
+    offsets, inverse = np.unique(np.round(utc_offset * 4) / 4, return_inverse=True)
+    (equation_of_time, sin_declination, cos_declination, eccentricity), minutes = _year_terms(index, offsets, shift)
+    hour_angle = equation_of_time
+    hour_angle += minutes
+    hour_angle *= np.pi / 720
+    hour_angle -= np.pi
+    terms = np.stack([sin_declination, cos_declination * np.cos(hour_angle), cos_declination * np.sin(hour_angle)], axis=1)
+    site_angle = (utc_offset * 60 - 4 * longitude) * (np.pi / 720)
+    return inverse.ravel(), np.radians(latitude), np.cos(site_angle), np.sin(site_angle), terms, eccentricity
+
+def _combine(inverse, weights, terms):
+    """
+    Sites x hours array of the sums over k of weights[site, k] * terms[group of the site, k, hour]
+    """
+    if len(terms) == 1: return weights @ terms[0]
+    values = np.empty((len(inverse), terms.shape[2]))
+    for group in range(len(terms)):
+        sites = np.flatnonzero(inverse == group)
+        values[sites] = weights[sites] @ terms[group]
+    return values
+
+def _cos_zenith(inverse, radians, cos_site, sin_site, terms):
+    cos_latitude = np.cos(radians)
+    return _combine(inverse, np.column_stack([np.sin(radians), cos_latitude * cos_site, cos_latitude * sin_site]), terms)
+
+def _zenith(cosz):
+    zenith = np.clip(cosz, -1, 1)
+    np.arccos(zenith, out=zenith)
+    return np.degrees(zenith, out=zenith)
+
+def _azimuth(inverse, radians, cos_site, sin_site, terms):
+    sin_latitude = np.sin(radians)
+    # cos(declination) sin(hour angle) and sin(latitude) cos(declination) cos(hour angle) - sin(declination) cos(latitude)
+    east = _combine(inverse, np.column_stack([np.zeros_like(radians), -sin_site, cos_site]), terms)
+    north = _combine(inverse, np.column_stack([-np.cos(radians), sin_latitude * cos_site, sin_latitude * sin_site]), terms)
+    azimuth = np.arctan2(east, north, out=east)
+    np.degrees(azimuth, out=azimuth)
+    azimuth += 180
+    azimuth[azimuth >= 360] -= 360 # arctan2 returns angles from -180 up to 180 degrees
+    return azimuth
+
+def _haurwitz(cosz, capacity):
+    day = cosz > 0
+    irradiance = np.zeros_like(cosz)
+    np.divide(-0.059, cosz, out=irradiance, where=day)
+    np.exp(irradiance, out=irradiance, where=day)
+    np.multiply(irradiance, cosz, out=irradiance, where=day)
+    if np.ndim(capacity): capacity = np.asarray(capacity, dtype=float)[:, np.newaxis]
+    irradiance *= capacity * 1.098 # 1098 W/m^2 relative to 1000 W/m^2
+    return irradiance
+
+def _shape(values, latitude, longitude):
+    return values[0] if np.ndim(latitude) == 0 and np.ndim(longitude) == 0 else values
+
+def cos_zenith(index, latitude, longitude, utc_offset=None, shift=0.5):
+    """
+    Cosine of the solar zenith angle for every hour and site. Negative values are hours the sun is below the horizon.
+
+    index: DatetimeIndex. Hourly time index, in local standard time unless it has a time zone
+    latitude: float or array. Latitudes of the sites in degrees, north is positive
+    longitude: float or array. Longitudes of the sites in degrees, east is positive
+    utc_offset: float or array. Hours the local standard time of the index is ahead of UTC, e.g. 10 for Brisbane
+                (optional). default = longitude / 15, the local mean solar time
+    shift: float. Hours added to the timestamps, 0.5 is the middle of hourly means labelled with the start
+                  of their hour like the ones of 'uq.load' (optional). default = 0.5
+
+    returns: array of the shape hours, or sites x hours if arrays of sites are passed
+    """
+    geometry = _geometry(index, latitude, longitude, utc_offset, shift)
+    return _shape(_cos_zenith(*geometry[:5]), latitude, longitude)
+
+def solar_position(index, latitude, longitude, utc_offset=None, shift=0.5):
+    """
+    Zenith and azimuth angle of the sun for every hour and site, see 'cos_zenith' for the parameters
+
+    returns: the zenith in degrees from the vertical and the azimuth in degrees clockwise from north
+    """
+    features = solar_features(index, latitude, longitude, utc_offset, ['solar_zenith', 'solar_azimuth'], shift)
+    return features['solar_zenith'], features['solar_azimuth']
+
+def extraterrestrial(index, utc_offset=0, shift=0.5):
+    """
+    Irradiance on a plane perpendicular to the sun at the top of the atmosphere in W/m^2, which varies
+    by about 3 % over the year with the distance to the sun
+
+    returns: array with one value per hour
+    """
+    return SOLAR_CONSTANT * _spencer(_day_angle(index, utc_offset, shift)[0])[2]
+
+def clear_sky(index, latitude, longitude, utc_offset=None, shift=0.5, capacity=1.0):
+    """
+    Clear-sky power envelope: the global horizontal irradiance of a cloudless sky after the model of Haurwitz
+    relative to 1000 W/m^2, times the capacity. It is zero at night and follows the daily and seasonal path of
+    the sun, so it is an upper bound of the power output up to the orientation and losses of the array.
+
+    capacity: float or array. Peak power of the sites, e.g. in watts (optional). default = 1
+    See 'cos_zenith' for the other parameters.
+
+    returns: array of the shape hours, or sites x hours if arrays of sites are passed
+    """
+    return _haurwitz(cos_zenith(index, latitude, longitude, utc_offset, shift), capacity)
+
+def solar_features(index, latitude, longitude, utc_offset=None, features=FEATURES, shift=0.5):
+    """
+    Computes several solar features at once from one evaluation of the geometry. Only the requested
+    features are computed, e.g. features=['clear_sky'] needs neither an arccos nor an arctan2.
+
+    features: list. Any of 'solar_zenith', 'solar_azimuth', 'extraterrestrial' and 'clear_sky' (optional). default = FEATURES
+    See 'cos_zenith' for the other parameters.
+
+    returns: a dict mapping every feature to an array of the shape hours, or sites x hours if arrays of sites are passed
+    """
+    unknown = [feature for feature in features if feature not in FEATURES]
+    if unknown: raise ValueError(f'unknown solar features {unknown}, use any of {FEATURES}')
+    inverse, radians, cos_site, sin_site, terms, eccentricity = _geometry(index, latitude, longitude, utc_offset, shift)
+    values = {}
+    if 'solar_zenith' in features or 'clear_sky' in features:
+        cosz = _cos_zenith(inverse, radians, cos_site, sin_site, terms)
+        if 'clear_sky' in features: values['clear_sky'] = _haurwitz(cosz, 1.0)
+        if 'solar_zenith' in features: values['solar_zenith'] = _zenith(cosz)
+    if 'solar_azimuth' in features: values['solar_azimuth'] = _azimuth(inverse, radians, cos_site, sin_site, terms)
+    if 'extraterrestrial' in features: values['extraterrestrial'] = SOLAR_CONSTANT * eccentricity[inverse]
+    return {feature: _shape(values[feature], latitude, longitude) for feature in features}
+
+def add_solar_features(data, latitude, longitude, utc_offset=None, features=FEATURES, shift=0.5):
+    """
+    Adds solar features of a site to a dataset, so they can be selected with the 'filter' of the predictors,
+    e.g. filter=['airtemp', 'humidity', 'clear_sky']. Add them to the whole dataset (and the base data of an
+    SVRModel) before cutting the training and testing windows.
+
+    data: DataFrame. Hourly dataset like the ones returned by the importers
+    features: list. Any of 'solar_zenith', 'solar_azimuth', 'extraterrestrial' and 'clear_sky' (optional). default = FEATURES
+    See 'cos_zenith' for the other parameters.
+
+    returns: a copy of 'data' with the additional columns
+    """
+    data = data.copy()
+    for feature, values in solar_features(data.index, latitude, longitude, utc_offset, features, shift).items():
+        data[feature] = values
+    return data
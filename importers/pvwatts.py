@@ -1,10 +1,25 @@
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 import os
 import pandas as pd
 import requests
+import random
 import json
+import time
 import warnings
+from importers.response_cache import ResponseCache
+from importers.rate_limit import TokenBucket
 
-API_KEY = os.environ['PVWATTS_API_KEY']
+API_KEY = os.environ.get('PVWATTS_API_KEY')
+API_URL = os.environ.get('PVWATTS_API_URL', 'https://developer.nrel.gov/api/pvwatts/v6.json')
+
+# responses are cached on disk, set PVWATTS_OFFLINE=1 to only use cached responses.
+# Assign another ResponseCache to configure size and ttl or None to disable caching
+CACHE = ResponseCache(os.environ.get('PVWATTS_CACHE_DIR', '.cache/pvwatts'), offline=os.environ.get('PVWATTS_OFFLINE') == '1')
+
+RATE_LIMIT = 1000 # requests per hour, default quota of the NREL developer network
+BURST = 10 # requests that may be sent at once, the refill is reduced by it to stay within RATE_LIMIT
+RETRY_STATUS = {429, 500, 502, 503, 504}
+CACHED_ERRORS = {400, 404, 422} # invalid for the parameters themselves, e.g. no intl data at a location, stored like responses
 
 def json_to_dataframe(json, keys=['ac', 'tamb', 'wspd']):
     outputs = json['outputs']
@@ -16,11 +31,50 @@ def json_to_dataframe(json, keys=['ac', 'tamb', 'wspd']):
     return data
 
 warnings.simplefilter('always')
-def load(system_capacity=4, module_type=0, losses=14, array_type=0, tilt=25, azimuth=180, address=None, lat=51.9607, lon=7.6261, radius=100, dataset='intl', suppress_warnings=False):
+def request(params, session=None, limiter=None, retries=0, backoff=1):
+    """
+    Sends a request to the PVWatts API. Responses with a status in RETRY_STATUS and
+    connection errors are retried with exponential backoff.
+
+    params: dict. Request parameters
+    session: requests.Session. Session used for the request (optional). default = no session
+    limiter: TokenBucket. Rate limiter every attempt takes a token from (optional)
+    retries: int. Maximum amount of retries (optional). default = 0
+    backoff: float. Seconds to wait before the first retry, doubled for each further retry (optional). default = 1
+    """
+    for attempt in range(retries + 1):
+        if limiter is not None: limiter.acquire()
+        try:
+            response = (session or requests).get(API_URL, params)
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt == retries: raise
+            time.sleep(backoff * 2**attempt * (1 + random.random()))
+            continue
+        if response.status_code not in RETRY_STATUS or attempt == retries:
+            return response
+        if response.status_code == 429 and limiter is not None: limiter.drain()
+        retry_after = response.headers.get('Retry-After', '')
+        time.sleep(float(retry_after) if retry_after.isdigit() else backoff * 2**attempt * (1 + random.random()))
+
+def _cached_error(json, params):
+    """
+    Raises the HTTPError of an error response that was stored in the cache
+    """
+    response = requests.Response()
+    response.status_code = json['status']
+    response.url = API_URL
+    response._content = b'{}'
+    raise requests.HTTPError(f"{json['status']} Client Error (cached): {json['errors']} for dataset={params['dataset']}", response=response)
+
+def load(system_capacity=4, module_type=0, losses=14, array_type=0, tilt=25, azimuth=180, address=None, lat=51.9607, lon=7.6261, radius=100, dataset='intl', suppress_warnings=False, use_cache=True, session=None, limiter=None, retries=0):
     """
     Imports data from PVWatts using the requests package.
     Only fields that are of importance for this forecasting purpose
-    can be specified.
+    can be specified. Successful responses are stored in CACHE and
+    requests with the same parameters are answered from there. Responses with
+    a status in CACHED_ERRORS are stored as well and raise the same HTTPError
+    again, so the tmy3 fallback of 'bulk_load' needs no request on later runs.
+    'session', 'limiter' and 'retries' are passed to 'request'.
     """
     params = {
         'api_key': API_KEY,
@@ -38,13 +92,26 @@ def load(system_capacity=4, module_type=0, losses=14, array_type=0, tilt=25, azi
         'dataset': dataset
     }
 
-    response = requests.get('https://developer.nrel.gov/api/pvwatts/v6.json', params)
+    cache = CACHE if use_cache else None
+    json = cache.get(params) if cache is not None else None
+    if json is not None:
+        if 'status' in json: _cached_error(json, params)
+        if not suppress_warnings and json['warnings']: warnings.warn(f'API WARNING: {json["warnings"]}')
+        print(f"loaded {json['station_info']['city']} from cache")
+        return json_to_dataframe(json)
+    if cache is not None and cache.offline:
+        raise RuntimeError(f'offline mode: no cached response for lat={lat}, lon={lon}, dataset={dataset}')
+
+    response = request(params, session=session, limiter=limiter, retries=retries)
     print(response.request.url)
     json = response.json()
     if not suppress_warnings:
         if json['errors']: warnings.warn(f'API ERROR: {json["errors"]}')
         if json['warnings']: warnings.warn(f'API WARNING: {json["warnings"]}')
+    if cache is not None and response.status_code in CACHED_ERRORS:
+        cache.put(params, {'status': response.status_code, 'errors': json.get('errors', []), 'warnings': json.get('warnings', [])})
     response.raise_for_status()
+    if cache is not None and not json['errors']: cache.put(params, json)
     print(f"loaded {json['station_info']['city']}")
     return json_to_dataframe(json)
 
@@ -62,23 +129,71 @@ def load_from_json(filepath, return_json=False):
     else:
         return json_to_dataframe(data)
 
-def bulk_load_from_list(filepath, range=None):
+def bulk_load(stations, workers=8, retries=5, limiter=None):
     """
-    Bulk Imports data from PVWatts using the load method.
+    Concurrently imports data from PVWatts for many stations using the load method.
+    All requests share one pooled session and are rate limited to stay within the API quota.
+    Stations for which the 'intl' dataset is not available are scheduled again with
+    the 'tmy3' dataset. Progress and failures are printed for each station.
+
+    stations: list. (city, lat, lon) tuples
+    workers: int. Maximum amount of concurrent requests (optional). default = 8
+    retries: int. Retries for rate limited or failed requests (optional). default = 5
+    limiter: TokenBucket. Rate limiter (optional). default = RATE_LIMIT requests per hour
+
+    returns: a dict mapping each city to its DataFrame, in the order of 'stations', and a dict
+             mapping each city that could not be loaded to its error
+    """
+    stations = list(stations)
+    if limiter is None: limiter = TokenBucket(rate=(RATE_LIMIT - BURST) / 3600, capacity=BURST)
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=workers)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+
+    results, failures = {}, {}
+    with session, ThreadPoolExecutor(max_workers=workers) as executor:
+        def submit(city, lat, lon, dataset):
+            future = executor.submit(load, lat=lat, lon=lon, dataset=dataset, suppress_warnings=dataset == 'intl',
+                                     session=session, limiter=limiter, retries=retries)
+            pending[future] = (city, lat, lon, dataset)
+
+        pending = {}
+        for city, lat, lon in stations: submit(city, lat, lon, 'intl')
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                city, lat, lon, dataset = pending.pop(future)
+                try:
+                    results[city] = future.result()
+                    print(f'[{len(results) + len(failures)}/{len(stations)}] {city}: loaded {dataset} data')
+                except requests.HTTPError as e:
+                    if dataset == 'intl' and e.response.status_code not in RETRY_STATUS:
+                        print(f'{city}: {dataset} data not available, retrying with tmy3')
+                        submit(city, lat, lon, 'tmy3')
+                        continue
+                    failures[city] = e
+                except Exception as e:
+                    failures[city] = e
+                if city in failures: print(f'[{len(results) + len(failures)}/{len(stations)}] {city}: FAILED {failures[city]}')
+    ordered = {city: results[city] for city, _, _ in stations if city in results}
+    return ordered, failures
+
+def bulk_load_from_list(filepath, range=None, workers=8):
+    """
+    Bulk Imports data from PVWatts using the bulk_load method.
+    Cities that could not be loaded are left out.
 
     filepath: str. Path to a csv file containing the columns 'city', 'lat' and 'lon'
     range: tuple. range of cities to load
+    workers: int. Maximum amount of concurrent requests (optional). default = 8
     """
     list = pd.read_csv(filepath)
     if not range: range = (0, len(list))
     start, stop = range
     list = list[start:stop]
-    cities = {}
-    for index, (city, lat, lon) in enumerate(list.values):
-        try:
-            cities[city] = load(lat=lat, lon=lon, suppress_warnings=True)
-        except requests.HTTPError as e:
-            cities[city] = load(lat=lat, lon=lon, dataset='tmy3')
+    cities, failures = bulk_load(list[['city', 'lat', 'lon']].values, workers=workers)
+    if failures: warnings.warn(f'could not load {len(failures)} cities: {", ".join(failures.keys())}')
     return cities
 
 def load_city_from_list(filepath, city):
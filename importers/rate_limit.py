@@ -0,0 +1,51 @@
+import threading
+import time
+
+class TokenBucket:
+    """
+    ---------------------------
+    ###### Token Bucket ######
+    ---------------------------
+
+    Thread safe token bucket rate limiter. Every request takes one token, tokens
+    are refilled continuously with the given rate up to the capacity of the bucket.
+
+    At most capacity + rate * t tokens are taken in any period of t seconds, so to stay within a quota
+    of N requests per hour the capacity plus one hour of refill must not exceed N.
+
+    rate: float. Tokens refilled per second
+    capacity: int. Maximum amount of tokens, i.e. the allowed burst. The bucket starts full
+    clock: function. Returns the current time in seconds (optional). default = time.monotonic
+    sleep: function. Waits the given seconds (optional). default = time.sleep
+    """
+    def __init__(self, rate, capacity, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Takes a token, blocks until one is available
+        """
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            self._sleep(wait)
+
+    def drain(self):
+        """
+        Empties the bucket, e.g. after the server reported that the quota is used up
+        """
+        with self._lock:
+            self._tokens = 0
+            self._updated = self._clock()
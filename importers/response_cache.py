@@ -0,0 +1,111 @@
+import tempfile
+import hashlib
+import json
+import gzip
+import time
+import os
+
+class ResponseCache:
+    """
+    -----------------------------
+    ###### Response Cache ######
+    -----------------------------
+
+    Content addressed on-disk cache for json API responses. Every response is stored
+    gzip compressed in a file named after the hash of the normalized request parameters.
+    When the cache grows beyond max_size, the least recently used responses are evicted.
+
+    directory: str. Directory the responses are stored in. Created if it does not exist
+    max_size: int. Maximum size of all stored responses in bytes (optional). default = 1 GB
+    ttl: float. Seconds after which a stored response is considered stale (optional). default = never
+    offline: Boolean. Whether only stored responses may be used. Callers should not make
+                      requests when this is set (optional). default = False
+    ignore: tuple. Parameters that are not part of the key, e.g. credentials (optional). default = ('api_key',)
+    """
+    def __init__(self, directory, max_size=2**30, ttl=None, offline=False, ignore=('api_key',)):
+        self.directory = directory
+        self.max_size = max_size
+        self.ttl = ttl
+        self.offline = offline
+        self._ignore = set(ignore)
+
+    def key(self, params):
+        """
+        Hash of the request parameters. Parameters that are None are not sent by requests
+        and are left out, all values are compared by their string representation.
+
+        params: dict. Request parameters
+        """
+        normalized = {key: str(value) for key, value in params.items() if key not in self._ignore and value is not None}
+        document = json.dumps(normalized, sort_keys=True)
+        return hashlib.sha256(document.encode('utf-8')).hexdigest()
+
+    def path(self, params):
+        return os.path.join(self.directory, f'{self.key(params)}.json.gz')
+
+    def get(self, params):
+        """
+        Returns the stored response for the parameters or None if there is no fresh one
+        """
+        path = self.path(params)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        now = time.time()
+        if self.ttl is not None and now - stat.st_mtime > self.ttl:
+            self._remove(path)
+            return None
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as file:
+                document = json.load(file)
+        except (OSError, ValueError): # corrupted or partially written file
+            self._remove(path)
+            return None
+        os.utime(path, (now, stat.st_mtime)) # access time tracks usage for the eviction, mtime the age for the ttl
+        return document
+
+    def put(self, params, document):
+        """
+        Stores a response and evicts the least recently used responses if the cache is too large
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(params)
+        descriptor, temporary = tempfile.mkstemp(suffix='.tmp', dir=self.directory) # unique per thread and process
+        with os.fdopen(descriptor, 'wb') as raw, gzip.open(raw, 'wt', encoding='utf-8') as file:
+            json.dump(document, file)
+        os.replace(temporary, path) # atomic, concurrent readers never see a partial file
+        self.evict()
+
+    def evict(self):
+        """
+        Removes the least recently used responses until the cache fits into max_size
+        """
+        entries = []
+        with os.scandir(self.directory) as iterator:
+            for entry in iterator:
+                if entry.name.endswith('.json.gz'):
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError: # evicted concurrently
+                        continue
+                    entries.append((stat.st_atime, stat.st_size, entry.path))
+        size = sum(entry[1] for entry in entries)
+        for _, entry_size, path in sorted(entries):
+            if size <= self.max_size: break
+            self._remove(path)
+            size -= entry_size
+
+    def clear(self):
+        """
+        Removes all stored responses
+        """
+        if not os.path.isdir(self.directory): return
+        for name in os.listdir(self.directory):
+            if name.endswith('.json.gz'): self._remove(os.path.join(self.directory, name))
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,121 @@
+import pandas as pd
+import numpy as np
+import json
+import os
+
+HOUR = 3600 * 10**9 # nanoseconds
+
+class DatasetStore:
+    """
+    ----------------------------
+    ###### Dataset Store ######
+    ----------------------------
+
+    Stores many hourly datasets (sites) in one memory-mapped float array of the shape
+    sites x hours x features with a shared hourly time index. Hours a site has no data
+    for are NaN. Windows are cut with integer offsets and are views into the mapped file,
+    so processes opening the same store share its pages instead of copying the data.
+
+    Use 'DatasetStore.create' to write a store, the constructor opens an existing one.
+
+    path: str. Directory of the store
+    """
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, 'meta.json')) as file:
+            meta = json.load(file)
+        self.sites = meta['sites']
+        self.features = meta['features']
+        self.index = pd.date_range(meta['start'], periods=meta['hours'], freq='H', name='time')
+        self._spans = {site: tuple(span) for site, span in zip(self.sites, meta['spans'])}
+        self._positions = {site: position for position, site in enumerate(self.sites)}
+        self.values = np.load(os.path.join(path, 'values.npy'), mmap_mode='r')
+
+    @classmethod
+    def create(cls, path, datasets, features=None, dtype=np.float64):
+        """
+        Writes datasets into a new store and opens it
+
+        path: str. Directory of the store, created if it does not exist
+        datasets: dict. Maps site names to hourly DataFrames like the ones returned by the importers
+        features: list. Columns to store (optional). default = columns of the first dataset
+        dtype: numpy dtype of the stored values (optional). default = float64
+        """
+        if features is None: features = list(next(iter(datasets.values())).columns)
+        start = min(data.index[0] for data in datasets.values())
+        end = max(data.index[len(data)-1] for data in datasets.values())
+        index = pd.date_range(start, end, freq='H', name='time')
+
+        os.makedirs(path, exist_ok=True)
+        values = np.lib.format.open_memmap(os.path.join(path, 'values.npy'), mode='w+', dtype=dtype, shape=(len(datasets), len(index), len(features)))
+        spans = []
+        for position, data in enumerate(datasets.values()):
+            data = data.reindex(columns=features)
+            offsets = (data.index.values.astype('datetime64[ns]').view(np.int64) - index[0].value) // HOUR
+            values[position] = np.nan
+            values[position, offsets] = data.values
+            spans.append([int(offsets[0]), int(offsets[len(offsets)-1]) + 1])
+        values.flush()
+        del values
+
+        meta = {'sites': list(datasets.keys()), 'features': features, 'start': str(index[0]), 'hours': len(index), 'spans': spans}
+        with open(os.path.join(path, 'meta.json'), 'w') as file:
+            json.dump(meta, file)
+        return cls(path)
+
+    def __getstate__(self):
+        return self.path # processes reopen the mapping instead of pickling the values
+
+    def __setstate__(self, path):
+        self.__init__(path)
+
+    def __len__(self):
+        return len(self.sites)
+
+    def __contains__(self, site):
+        return site in self._positions
+
+    def __getitem__(self, site):
+        return self.frame(site)
+
+    def keys(self):
+        return list(self.sites)
+
+    def offset(self, timestamp, end=False):
+        """
+        Offset of a timestamp in the shared hourly index. Strings are interpreted like in
+        pandas partial string indexing: with end=True the offset after the last hour of
+        the period (e.g. '20190131' as a whole day) is returned, otherwise the first.
+        """
+        if isinstance(timestamp, str):
+            period = pd.Period(timestamp)
+            timestamp = period.end_time if end else period.start_time
+        nanoseconds = pd.Timestamp(timestamp).value - self.index[0].value
+        if end: return nanoseconds // HOUR + 1
+        return -(-nanoseconds // HOUR) # first full hour at or after the timestamp
+
+    def bounds(self, site, start=None, end=None):
+        """
+        Integer offsets (first, last + 1) of a window of a site, both ends are inclusive
+        like string based slicing of a DataFrame. Without start or end the span of the site is used.
+        """
+        first, last = self._spans[site]
+        if start is not None: first = max(first, self.offset(start))
+        if end is not None: last = min(last, self.offset(end, end=True))
+        return first, max(first, last)
+
+    def window(self, site, start=None, end=None):
+        """
+        Returns the values (hours x features) of a window as a view into the mapped file
+        """
+        first, last = self.bounds(site, start, end)
+        return self.values[self._positions[site], first:last]
+
+    def frame(self, site, start=None, end=None):
+        """
+        Returns a window as DataFrame backed by the mapped values, i.e. the DataFrame
+        a run script would get with data[start:end]
+        """
+        first, last = self.bounds(site, start, end)
+        values = self.values[self._positions[site], first:last]
+        return pd.DataFrame(values, index=self.index[first:last], columns=self.features, copy=False)
@@ -0,0 +1,134 @@
+from features import solar
+from scipy.signal import lfilter
+import pandas as pd
+import numpy as np
+import os
+
+# columns, rounding and default start of the frames returned by 'uq.load' and 'pvwatts.json_to_dataframe'
+LAYOUTS = {
+    'uq': {'columns': ['airtemp', 'humidity', 'windspeed', 'winddirection', 'power'], 'decimals': 2, 'start': '20140101'},
+    'pvwatts': {'columns': ['tamb', 'wspd', 'power'], 'decimals': 1, 'start': '20190101'},
+}
+BATCH_SIZE = 256 # sites generated together, memory grows with BATCH_SIZE x hours
+
+def _sites(sites):
+    return list(range(sites)) if isinstance(sites, int) else list(sites)
+
+def _parameters(random, layout):
+    """
+    latitude, capacity in watts and mean air temperature of a site
+    """
+    latitude = random.uniform(-45, 55)
+    capacity = 4000 * random.uniform(0.8, 1.2) if layout == 'pvwatts' else random.uniform(2e4, 4e5)
+    temperature = 28 - 0.35 * abs(latitude) + random.normal(0, 2)
+    return latitude, capacity, temperature
+
+def location(number=0, seed=0):
+    """
+    Location of a synthetic site for 'solar.add_solar_features', e.g. solar.add_solar_features(data, **synthetic.location(3)).
+    The time index of the synthetic data is local solar time, so the longitude and utc offset are zero.
+    """
+    latitude = _parameters(np.random.default_rng([seed, number]), 'uq')[0] # the latitude is drawn first in every layout
+    return {'latitude': latitude, 'longitude': 0.0, 'utc_offset': 0.0}
+
+def _batch(index, sites, seed, layout):
+    """
+    Generates a batch of sites at once as array of the shape sites x hours x columns of the layout.
+    Every site only depends on the seed and its number.
+    """
+    hours = len(index)
+    days = -(-hours // 24)
+    randoms = [np.random.default_rng([seed, site]) for site in sites]
+    latitude, capacity, temperature = (np.array(values)[:, np.newaxis] for values in zip(*(_parameters(random, layout) for random in randoms)))
+    noise = np.stack([random.standard_normal((5, hours), dtype=np.float32) for random in randoms], axis=1) # noise process x sites x hours
+    weather = np.stack([random.standard_normal(days) for random in randoms])
+
+    # clear-sky irradiance of the Haurwitz model, reduced by persistent weather regimes and passing clouds
+    clear_sky = solar.clear_sky(index, latitude[:, 0], 0.0, 0.0, capacity=np.full(len(sites), 1000.0))
+    regime = np.repeat(lfilter([1], [1, -0.7], weather, axis=1), 24, axis=1)[:, :hours]
+    clouds = lfilter([1], [1, -0.8], noise[0], axis=1)
+    clear_sky_index = np.clip(0.75 + 0.15 * regime + 0.06 * clouds, 0.05, 1)
+    irradiance = clear_sky * clear_sky_index
+
+    # air temperature with a seasonal and a diurnal cycle, warmer on clear days
+    day = index.dayofyear.values
+    summer = np.where(latitude >= 0, 200, 17)
+    season = 0.3 * np.abs(latitude) * np.cos(2 * np.pi * (day - summer) / 365)
+    diurnal = 5 * np.sin(2 * np.pi * (index.hour.values - 9) / 24) * (0.4 + 0.6 * clear_sky_index)
+    airtemp = temperature + season + diurnal + lfilter([1], [1, -0.95], noise[1], axis=1) * 0.4
+    humidity = np.clip(75 - 2.5 * diurnal + 20 * (1 - clear_sky_index) + 3 * noise[2], 5, 100)
+    windspeed = np.abs(3 + 1.5 * lfilter([1], [1, -0.9], noise[3], axis=1) * 0.45)
+    winddirection = np.mod(180 + np.cumsum(noise[4] * 10, axis=1), 360)
+
+    # power output with the usual loss of 0.4 % per degree the cells are above 25 degrees
+    cell_temperature = airtemp + irradiance * 0.03
+    power = np.clip(capacity * irradiance / 1000 * (1 - 0.004 * (cell_temperature - 25)), 0, None)
+    columns = {'airtemp': airtemp, 'tamb': airtemp, 'humidity': humidity, 'windspeed': windspeed, 'wspd': windspeed,
+               'winddirection': winddirection, 'power': power}
+    settings = LAYOUTS[layout]
+    values = np.stack([columns[column] for column in settings['columns']], axis=2)
+    return np.round(values, settings['decimals'], out=values)
+
+def generate(sites, start=None, hours=365*24, layout='uq', seed=0, batch_size=BATCH_SIZE):
+    """
+    Generates synthetic hourly datasets of photovoltaic sites with a vectorized clear-sky and diurnal model,
+    random latitudes and capacities and autoregressive cloud, temperature and wind processes. The frames have
+    the same columns as the ones returned by 'uq.load' or 'pvwatts.json_to_dataframe'. A site only depends on
+    the seed and its number, so a fleet can be extended or generated in parts and gives the same data.
+
+    sites: int or list. Amount of sites, or the numbers of the sites to generate
+    start: str. First hour (optional). default = the year of the layout's real data
+    hours: int. Hours per site (optional). default = one year
+    layout: str. 'uq' or 'pvwatts' (optional). default = 'uq'
+    seed: int. Seed of the fleet (optional). default = 0
+    batch_size: int. Sites generated at once (optional). default = BATCH_SIZE
+
+    returns: a generator of (site name, DataFrame) pairs
+    """
+    if layout not in LAYOUTS: raise ValueError(f'layout has to be one of {list(LAYOUTS)}')
+    settings = LAYOUTS[layout]
+    index = pd.date_range(start or settings['start'], periods=hours, freq='H', name='time')
+    sites = _sites(sites)
+    for position in range(0, len(sites), batch_size):
+        batch = sites[position:position + batch_size]
+        values = _batch(index, batch, seed, layout)
+        for row, site in enumerate(batch):
+            yield f'site_{site}', pd.DataFrame(values[row], index=index, columns=settings['columns'])
+
+def fleet(sites, start=None, hours=365*24, layout='uq', seed=0):
+    """
+    Same as 'generate', but returns a dict mapping the site names to their DataFrames, e.g. for 'backtest.run'
+    """
+    return dict(generate(sites, start, hours, layout, seed))
+
+def site(number=0, start=None, hours=365*24, layout='uq', seed=0):
+    """
+    returns: the DataFrame of one synthetic site, see 'generate'
+    """
+    return next(generate([number], start, hours, layout, seed))[1]
+
+def write_uq_files(data, power_file, weather_file=None, minutes=1):
+    """
+    Writes a synthetic dataset in the uq layout as raw power and weather files that can be read with 'uq.load'.
+    The hourly values are repeated every 'minutes' minutes and power is only recorded while it is above zero.
+    Without 'weather_file' only the power file is written, e.g. for sites sharing the weather file of another site.
+    """
+    index = pd.date_range(data.index[0], data.index[len(data)-1] + pd.Timedelta(minutes=60 - minutes), freq=f'{minutes}min', name='time')
+    raw = data.reindex(index, method='ffill')
+    for filepath in [power_file, weather_file]:
+        directory = os.path.dirname(filepath or '')
+        if directory: os.makedirs(directory, exist_ok=True)
+    if weather_file:
+        weather = raw.drop(columns='power')
+        weather['insolation'] = (raw.power / 100).round(1)
+        weather.to_csv(weather_file)
+    daytime = raw[raw.power > 0]
+    pd.DataFrame({'power (W)': daytime.power, 'energy (Wh)': (daytime.power * minutes / 60).round(2)}, index=daytime.index).to_csv(power_file)
+
+def pvwatts_response(data, city='synthetic'):
+    """
+    Turns a synthetic dataset in the pvwatts layout into a response of the PVWatts API as read by
+    'pvwatts.json_to_dataframe' and 'pvwatts.load_from_json'
+    """
+    outputs = {'ac': data.power.tolist(), 'tamb': data.tamb.tolist(), 'wspd': data.wspd.tolist()}
+    return {'outputs': outputs, 'station_info': {'city': city}, 'errors': [], 'warnings': []}
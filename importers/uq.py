@@ -1,27 +1,157 @@
+from functools import lru_cache
+import instrumentation
 import pandas as pd
+import numpy as np
+import tempfile
+import hashlib
+import os
 
-def load(power_file, weather_file, with_insolation=False):
+# hourly output of 'load' is cached in this directory, keyed by the source files and arguments
+CACHE_DIR = os.environ.get('UQ_CACHE_DIR', '.cache/uq')
+# St Lucia campus, the files are in australian eastern standard time without daylight saving, see 'solar.add_solar_features'
+LOCATION = {'latitude': -27.4975, 'longitude': 153.0137, 'utc_offset': 10}
+
+def signature(filepath):
+    """
+    Identifies a file version by its absolute path, modification time and size
+    """
+    stat = os.stat(filepath)
+    return os.path.abspath(filepath), stat.st_mtime_ns, stat.st_size
+
+def read_csv(filepath):
+    return pd.read_csv(filepath, parse_dates=['time']).set_index('time')
+
+@lru_cache(maxsize=8)
+def _read_weather(filepath, mtime, size):
+    return read_csv(filepath)
+
+def read_weather(filepath):
+    """
+    Parses a weather file. The last parsed weather files are kept in memory, so a weather
+    file shared by several sites is only parsed once. Do not modify the returned DataFrame.
+    """
+    return _read_weather(*signature(filepath))
+
+def _cache_path(power_file, weather_file, with_insolation):
+    key = repr((signature(power_file), signature(weather_file), with_insolation))
+    return os.path.join(CACHE_DIR, f'{hashlib.sha256(key.encode("utf-8")).hexdigest()}.npz')
+
+def _read_cache(path):
+    with np.load(path) as cached:
+        index = pd.DatetimeIndex(cached['index'], name='time', freq='H')
+        return pd.DataFrame(cached['values'], index=index, columns=list(cached['columns']))
+
+def _write_cache(path, data):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    descriptor, temporary = tempfile.mkstemp(suffix='.tmp', dir=CACHE_DIR)
+    with os.fdopen(descriptor, 'wb') as file:
+        np.savez(file, index=data.index.values.astype('datetime64[ns]').view(np.int64), values=data.values, columns=np.array(data.columns, dtype=str))
+    os.replace(temporary, path)
+
+def _sorted_chunks(reader, filepath):
+    previous = None
+    for chunk in reader:
+        chunk = chunk.set_index('time')
+        if not chunk.index.is_monotonic_increasing or (previous is not None and chunk.index[0] < previous):
+            raise pd.errors.ParserError(f'{filepath} needs to be sorted by time to be loaded in chunks')
+        if len(chunk): previous = chunk.index[len(chunk)-1]
+        yield chunk
+
+def _load_chunked(power_file, weather_file, chunksize):
+    """
+    Same as the merging and resampling in 'load', but both files are read in chunks of 'chunksize' rows
+    and every chunk is aggregated to hourly values right away. The rows of the last hour of a chunk are
+    carried over to the next chunk, so every hourly mean is computed from the same rows as in 'load'.
+    """
+    power_chunks = _sorted_chunks(pd.read_csv(power_file, parse_dates=['time'], usecols=['time', 'power (W)'], chunksize=chunksize), power_file)
+    weather_chunks = _sorted_chunks(pd.read_csv(weather_file, parse_dates=['time'], chunksize=chunksize), weather_file)
+    power = next(power_chunks)['power (W)']
+    power_first, power_last, power_done = power.index[0], power.index[len(power)-1], False
+    weather_first = weather_last = None
+    carry = None
+    hours = []
+
+    for weather in weather_chunks:
+        if weather_first is None and len(weather): weather_first = weather.index[0]
+        weather = weather.loc[~weather.index.duplicated(keep='first')] # remove duplicates
+        if weather_last is not None: weather = weather[weather.index != weather_last] # duplicates across chunks
+        if len(weather) == 0: continue
+        weather_last = weather.index[len(weather)-1]
+        while not power_done and power_last <= weather_last: # read power until it covers the chunk
+            try:
+                chunk = next(power_chunks)['power (W)']
+            except StopIteration:
+                power_done = True
+                break
+            if len(chunk): power_last = chunk.index[len(chunk)-1]
+            power = pd.concat([power, chunk])
+        power = power.loc[~power.index.duplicated(keep='first')]
+
+        weather = weather.copy()
+        weather['power'] = power # integrate power into weather data
+        power = power[power.index > weather_last]
+        weather = weather.fillna(0) # fill NaN values with zeros, because power is only specified for daytime
+
+        if carry is not None: weather = pd.concat([carry, weather])
+        bins = weather.index.floor('H')
+        last_bin = bins[len(bins)-1]
+        carry = weather[bins == last_bin] # the last hour might continue in the next chunk
+        complete = weather[bins != last_bin]
+        if len(complete): hours.append(complete.resample('H').mean())
+
+    if weather_first is None: raise pd.errors.ParserError(f'{weather_file} does not contain any data')
+    for chunk in power_chunks: # the last date of the power file is needed for validation
+        if len(chunk): power_last = chunk.index[len(chunk)-1]
+    if power_first.date() != weather_first.date() or power_last.date() != weather_last.date():
+        raise pd.errors.ParserError('The dates of the power and weather file need to match')
+
+    hours.append(carry.resample('H').mean())
+    data = pd.concat(hours)
+    data = data.reindex(pd.date_range(data.index[0], data.index[len(data)-1], freq='H', name='time')) # hours missing between chunks
+    return data
+
+def load(power_file, weather_file, with_insolation=False, use_cache=True, chunksize=None):
     """
     Imports data from a power file and an associated weather file
     Such files can be downloaded from 'http://solar.uq.edu.au/user/reportPower.php'
+    The result is cached in CACHE_DIR until one of the files changes.
 
     power_file: path to the file containing the power output values
     weather_file: path to the file containting the weather data
+    with_insolation: Boolean. Whether the insolation column should be kept (optional). default = False
+    use_cache: Boolean. Whether the cached result should be used and stored (optional). default = True
+    chunksize: int. If set, both files are streamed in chunks of this many rows and aggregated to hourly values
+                    chunk by chunk, so the raw data never has to fit into memory. The files need to be sorted by
+                    time, the result is the same as without chunks (optional). default = None
 
     returns: a pandas DataFrame containing the combined values
     """
+    if use_cache:
+        path = _cache_path(power_file, weather_file, with_insolation)
+        try:
+            return _read_cache(path)
+        except (OSError, KeyError, ValueError): # not cached yet or unreadable
+            pass
 
-    power = pd.read_csv(power_file, parse_dates=['time']).set_index('time')
-    weather = pd.read_csv(weather_file, parse_dates=['time']).set_index('time')
+    if chunksize:
+        with instrumentation.stage('csv_parse', file=power_file, chunked=True): # parsing and resampling per chunk
+            data = _load_chunked(power_file, weather_file, chunksize)
+    else:
+        with instrumentation.stage('csv_parse', file=power_file):
+            power = read_csv(power_file)
+            weather = read_weather(weather_file).copy()
 
-    if power.index[0].date() != weather.index[0].date() or power.index[len(power)-1].date() != weather.index[len(weather)-1].date():
-        raise pd.errors.ParserError('The dates of the power and weather file need to match')
+        if power.index[0].date() != weather.index[0].date() or power.index[len(power)-1].date() != weather.index[len(weather)-1].date():
+            raise pd.errors.ParserError('The dates of the power and weather file need to match')
 
-    weather['power'] = power['power (W)'] # integrate power into weather data
-    data = weather.loc[~weather.index.duplicated(keep='first')] # remove duplicates
-    data = data.fillna(0) # fill NaN values with zeros, because power is only specified for daytime
-    data = data.resample('H').mean() # resample with hourly average
+        with instrumentation.stage('resample', file=power_file):
+            weather['power'] = power['power (W)'] # integrate power into weather data
+            data = weather.loc[~weather.index.duplicated(keep='first')] # remove duplicates
+            data = data.fillna(0) # fill NaN values with zeros, because power is only specified for daytime
+            data = data.resample('H').mean() # resample with hourly average
     data = data.fillna(0) # necessary again after resampling
     data = data.round(2) # cutoff unnessecary decimal points
     if not with_insolation: data.drop('insolation', axis=1, inplace=True)
+
+    if use_cache: _write_cache(path, data)
     return data
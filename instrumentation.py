@@ -0,0 +1,210 @@
+from contextvars import ContextVar
+from datetime import datetime
+import pandas as pd
+import json
+import time
+import sys
+import os
+try:
+    import resource
+except ImportError: # windows
+    resource = None
+
+# file descriptor the events are appended to, None while the instrumentation is disabled
+_file = None
+# innermost running stage and the tags that nested stages inherit
+_context = ContextVar('instrumentation_context', default=(None, {}))
+# whether the peak memory of the process can be reset, which is needed to measure the peak of each stage
+_resettable = None
+
+def enable(path):
+    """
+    Starts recording stages. Every finished stage is appended to 'path' as one json line with its wall time,
+    cpu time, peak memory and its tags. On linux the peak is measured per stage (stages in parallel threads
+    share it), elsewhere the peak of the whole process so far is written as 'process_peak_rss_mb'. Worker processes forked while the instrumentation
+    is enabled write to the same file.
+
+    path: str. jsonl file for the events, appended to if it exists
+    """
+    global _file, _resettable
+    disable()
+    _resettable = reset_peak_rss()
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    _file = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+
+def disable():
+    """
+    Stops recording stages
+    """
+    global _file
+    if _file is not None: os.close(_file)
+    _file = None
+
+def enabled():
+    return _file is not None
+
+def reset_peak_rss():
+    """
+    Resets the peak resident set size of the process, which is only possible on linux
+
+    returns: whether the peak was reset
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as file: file.write('5')
+        return True
+    except OSError:
+        return False
+
+def _status_mb(field):
+    with open('/proc/self/status') as file:
+        for line in file:
+            if line.startswith(field): return int(line.split()[1]) / 1024
+    return None
+
+def peak_rss_mb(reset=False):
+    """
+    Peak resident set size in MB, since the last 'reset_peak_rss' if 'reset' is True and otherwise of the whole
+    process so far. None if it is not known, e.g. on windows
+    """
+    if reset: return _status_mb('VmHWM:')
+    if resource is None: return None
+    maximum = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maximum / 1024 / (1024 if sys.platform == 'darwin' else 1)
+
+def _emit(event):
+    if _file is None: return
+    os.write(_file, (json.dumps(event, default=str) + '\n').encode('utf-8')) # one write per line, lines of processes do not interleave
+
+class _DisabledStage:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        return False
+
+    def record(self, **fields):
+        pass
+
+_DISABLED = _DisabledStage()
+
+class Stage:
+    """
+    ----------------------
+    ###### Stage ######
+    ----------------------
+
+    A timed stage, use it through 'stage'. Tags are inherited by the stages started inside of it.
+    Fields added with 'record' are written with the event of the stage.
+    """
+    def __init__(self, name, tags):
+        self.name = name
+        self.fields = {}
+        self._tags = tags
+        self._token = None
+
+    def record(self, **fields):
+        self.fields.update(fields)
+
+    def __enter__(self):
+        parent, tags = _context.get()
+        self._parent = parent
+        self.parent = parent.name if parent is not None else None
+        self.tags = {**tags, **self._tags}
+        self._token = _context.set((self, self.tags))
+        if _resettable:
+            # the peak so far belongs to the running stages, then it is reset to measure this stage on its own
+            if parent is not None: parent._peak = max(parent._peak, peak_rss_mb(reset=True))
+            reset_peak_rss()
+            self._rss = self._peak = _status_mb('VmRSS:')
+        self._cpu = time.process_time()
+        self._start = time.perf_counter()
+        return self
+
+    def _memory(self):
+        """
+        Peak resident memory of this stage and its growth over the memory at the start of the stage. Without the
+        reset of the peak (on other systems than linux) the peak of the whole process is reported instead.
+        """
+        if not _resettable:
+            peak = peak_rss_mb()
+            return {} if peak is None else {'process_peak_rss_mb': round(peak, 1)}
+        peak = max(self._peak, peak_rss_mb(reset=True))
+        if self._parent is not None: self._parent._peak = max(self._parent._peak, peak)
+        return {'peak_rss_mb': round(peak, 1), 'peak_rss_growth_mb': round(peak - self._rss, 1)}
+
+    def __exit__(self, exception_type, exception, traceback):
+        wall = time.perf_counter() - self._start
+        cpu = time.process_time() - self._cpu
+        memory = self._memory()
+        _context.reset(self._token)
+        _emit({'stage': self.name, 'parent': self.parent, **self.tags, 'wall_seconds': round(wall, 6), 'cpu_seconds': round(cpu, 6),
+               **memory, 'failed': exception_type is not None, **self.fields, 'pid': os.getpid(), 'finished': datetime.now().isoformat()})
+        return False
+
+def stage(name, **tags):
+    """
+    Measures a named stage, e.g.
+
+        with instrumentation.stage('cell', site='car_2014', window='jan', model='arima'):
+            with instrumentation.stage('fit') as fit:
+                ...
+                fit.record(iterations=38)
+
+    While the instrumentation is disabled a shared object that does nothing is returned.
+
+    name: str. Name of the stage, e.g. 'csv_parse', 'scaling' or 'arima_fit'
+    tags: further keyword arguments are tags of this stage and all stages inside of it, e.g. site, window and model
+
+    returns: a context manager
+    """
+    if _file is None: return _DISABLED
+    return Stage(name, tags)
+
+def optimizer_fields(results):
+    """
+    Iterations, function calls and convergence of a statsmodels likelihood optimization as fields for 'Stage.record'
+    """
+    retvals = getattr(results, 'mle_retvals', None) or {}
+    return {'iterations': retvals.get('iterations'), 'function_calls': retvals.get('fcalls'), 'converged': retvals.get('converged')}
+
+def read(path):
+    """
+    returns: the events of a jsonl file written while the instrumentation was enabled as DataFrame
+    """
+    with open(path) as file:
+        events = []
+        for line in file:
+            try:
+                events.append(json.loads(line))
+            except ValueError: # incomplete last line of a crashed run
+                continue
+    return pd.DataFrame(events)
+
+def summary(events, top=10, cell='cell'):
+    """
+    Summarizes recorded stages
+
+    events: DataFrame or str. Events, or the path of the jsonl file they were written to
+    top: int. Amount of slowest cells to list (optional). default = 10
+    cell: str. Name of the stage around one cell of a sweep (optional). default = 'cell'
+
+    returns: a DataFrame with count, total, mean and max wall time, total cpu time and peak memory per stage
+             and a DataFrame of the slowest cells with their tags and the wall time of each stage inside of them
+    """
+    if isinstance(events, str): events = read(events)
+    if len(events) == 0: return pd.DataFrame(), pd.DataFrame()
+    memory = [column for column in ['peak_rss_mb', 'process_peak_rss_mb'] if column in events.columns]
+    stages = events.groupby('stage').agg(count=('wall_seconds', 'size'), wall_seconds=('wall_seconds', 'sum'),
+                                         mean_seconds=('wall_seconds', 'mean'), max_seconds=('wall_seconds', 'max'),
+                                         cpu_seconds=('cpu_seconds', 'sum'), **{column: (column, 'max') for column in memory})
+    stages = stages.sort_values('wall_seconds', ascending=False)
+
+    tags = [tag for tag in ['site', 'window', 'model'] if tag in events.columns]
+    if not tags or not (events.stage == cell).any():
+        return stages, pd.DataFrame()
+    cells = events[events.stage == cell].set_index(tags)[['wall_seconds', 'cpu_seconds', *memory, 'failed']]
+    inside = events[(events.stage != cell) & events[tags].notna().all(axis=1)]
+    breakdown = inside.pivot_table(index=tags, columns='stage', values='wall_seconds', aggfunc='sum')
+    slowest = cells.sort_values('wall_seconds', ascending=False).head(top)
+    return stages, slowest.join(breakdown.add_suffix('_seconds'))
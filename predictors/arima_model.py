@@ -1,13 +1,23 @@
 from pmdarima import auto_arima, ARIMA
+from statsmodels.tsa.statespace.sarimax import SARIMAX
 import pandas as pd
-from sklearn.preprocessing import StandardScaler
+import numpy as np
+from predictors.scaling import fit_scaler, target_affine, buffer
+from predictors import arima_search, pmdarima_compat
+import instrumentation
 import warnings
+import time
 
-def validate_fit_params(order, seasonal_order, filter, use_exogenous):
+PERIOD = 24 # hours of the daily cycle
+
+def validate_fit_params(order, seasonal_order, filter, use_exogenous, fourier_terms=None):
     if not (isinstance(order, tuple) and len(order) == 3):
         raise TypeError('order has to be a tuple with three values (p,d,q)')
     if (seasonal_order is not None) and not (isinstance(seasonal_order, tuple) and len(seasonal_order) == 4):
         raise TypeError('seasonal_order has to be a tuple with four values (P,D,Q,s)')
+    # the sine of the harmonic PERIOD // 2 is zero at every hour, which would make the regressors singular
+    if fourier_terms is not None and not (isinstance(fourier_terms, int) and 0 < fourier_terms < PERIOD // 2):
+        raise TypeError(f'fourier_terms has to be an int between 1 and {PERIOD // 2 - 1}')
     warn_on_filter_exogenous(filter, use_exogenous)
 
 def validate_fit_auto_params(hyperparameters, filter, use_exogenous):
@@ -21,6 +31,71 @@ def warn_on_filter_exogenous(filter, use_exogenous):
     if not use_exogenous and filter:
         warnings.warn('When using no exogenous variables the filter is ignored, since only the power output will be used for prediction')
 
+def fourier_series(index, harmonics, period=PERIOD):
+    """
+    Sine and cosine pairs of the first 'harmonics' harmonics of the daily cycle for the given hours
+
+    index: DatetimeIndex. Hours to compute the terms for
+    harmonics: int. Amount of harmonic pairs (K)
+    period: int. Length of the cycle in hours (optional). default = 24
+
+    returns: a DataFrame with the columns 'sin_1', 'cos_1', ..., 'sin_K', 'cos_K'
+    """
+    columns = [f'{function}_{harmonic}' for harmonic in range(1, harmonics + 1) for function in ['sin', 'cos']]
+    return pd.DataFrame(fourier_values(index, harmonics, period), index=index, columns=columns)
+
+def fourier_values(index, harmonics, period=PERIOD, out=None):
+    """
+    Same as 'fourier_series' as array, optionally written into 'out' (len(index) x 2*harmonics)
+    """
+    hours = index.hour.values + index.minute.values / 60
+    angles = 2 * np.pi * np.outer(hours, np.arange(1, harmonics + 1)) / period
+    if out is None: out = np.empty((len(index), 2 * harmonics))
+    np.sin(angles, out=out[:, 0::2])
+    np.cos(angles, out=out[:, 1::2])
+    return out
+
+def sarimax_spec(model):
+    """
+    Keyword arguments of the statsmodels SARIMAX underlying a fitted pmdarima model
+    """
+    fitted = model.arima_res_.model
+    if not isinstance(fitted, SARIMAX) or fitted.simple_differencing:
+        raise TypeError('state updates are only supported for models fit with statsmodels SARIMAX without simple differencing')
+    return {'order': tuple(fitted.order), 'seasonal_order': tuple(fitted.seasonal_order), 'trend': fitted.trend,
+            'measurement_error': fitted.measurement_error, 'time_varying_regression': fitted.time_varying_regression,
+            'mle_regression': fitted.mle_regression, 'enforce_stationarity': fitted.enforce_stationarity,
+            'enforce_invertibility': fitted.enforce_invertibility, 'hamilton_representation': fitted.hamilton_representation}
+
+def state_space(model, y, exogenous=None):
+    """
+    Builds a statsmodels SARIMAX with the same specification as a fitted pmdarima model for other data
+    """
+    return SARIMAX(y, exog=exogenous, **sarimax_spec(model))
+
+def state_forecasts(state_model, params, positions, horizon):
+    """
+    Runs the Kalman filter once over the data of 'state_model' with fixed parameters and forecasts
+    'horizon' steps from every position, using only the observations before it. All forecasts are
+    computed together by propagating the predicted states with the transition matrix.
+
+    returns: array of shape (horizon, positions)
+    """
+    results = state_model.filter(params)
+    state = results.predicted_state[:, positions]
+    ssm = state_model.ssm
+    states = ssm.k_states # statsmodels drops the time dimension of time invariant matrices
+    transition = ssm['transition'].reshape(states, states, -1)[:, :, 0]
+    design = ssm['design'].reshape(states, -1)[:, 0]
+    obs_intercept = ssm['obs_intercept'].reshape(-1)
+    state_intercept = ssm['state_intercept'].reshape(states, -1)
+    forecasts = np.empty((horizon, len(positions)))
+    for step in range(horizon):
+        times = positions + step
+        forecasts[step] = design @ state + (obs_intercept[times] if len(obs_intercept) > 1 else obs_intercept[0])
+        state = transition @ state + (state_intercept[:, times] if state_intercept.shape[1] > 1 else state_intercept[:, :1])
+    return forecasts
+
 class ARIMAModel:
     """
     -----------------------------
@@ -36,12 +111,18 @@ class ARIMAModel:
         self.prediction = None
         self.model = None
         self.use_exogenous = None
+        self.search_results = None
+        self.fit_time = None
+        self.fit_iterations = None
+        self.fourier_terms = None
 
         self._scaling = scaling
-        self._scaler = StandardScaler()
+        self._scaler = None
         self._filter = None
+        self._affine = None
+        self._buffer = None
 
-    def fit(self, data, order=None, seasonal_order=None, filter=None, use_exogenous=True):
+    def fit(self, data, order=None, seasonal_order=None, filter=None, use_exogenous=True, start_params=None, fourier_terms=None):
         """
         Fit the model with a dataset and specif hyperparameters. If you want to let
         pmdarima search for good hyperparameters use the 'fit_auto' method instead.
@@ -53,35 +134,77 @@ class ARIMAModel:
                       will be ignored if use_exogenous is False
         use_exogenous: Boolean. Set whether exogenous features from 'data' should
                        be used for fitting and prediction (optional). default = True
+        start_params: array or ARIMAModel. Initial point of the likelihood optimizer, either the parameters themselves or
+                      a fitted ARIMAModel with the same orders and features, e.g. the model of the previous month. Close
+                      start parameters need fewer optimizer iterations (optional). default = statsmodels default start parameters
+        fourier_terms: int. Models the daily cycle with this many sine and cosine pairs as additional exogenous regressors,
+                       so a non-seasonal order can be used instead of a seasonal order with s=24. The terms are generated
+                       for the predicted hours automatically (optional). default = None
         """
-        validate_fit_params(order, seasonal_order, filter, use_exogenous)
+        validate_fit_params(order, seasonal_order, filter, use_exogenous, fourier_terms)
+        if seasonal_order is None: seasonal_order = (0, 0, 0, 0) # newer pmdarima versions do not accept None
+        if isinstance(start_params, ARIMAModel):
+            start_params = start_params.warm_start_params(order, seasonal_order, filter, use_exogenous, fourier_terms)
         self.use_exogenous = use_exogenous
-        self.model = ARIMA(order=order, seasonal_order=seasonal_order, with_intercept=False)
+        self.fourier_terms = fourier_terms
+        self._affine = None
+        self.model = ARIMA(order=order, seasonal_order=seasonal_order, start_params=start_params, with_intercept=False)
 
-        if use_exogenous:
-            if filter:
-                filter = filter.copy()
-                filter.append('power')
-                self._filter = filter
-                data = data.filter(self._filter)
+        with instrumentation.stage('arima_fit'):
+            if use_exogenous:
+                if filter:
+                    filter = filter.copy()
+                    filter.append('power')
+                    self._filter = filter
+                    data = data.filter(self._filter)
+                else:
+                    self._filter = list(data.keys())
+                if self._scaling:
+                    with instrumentation.stage('scaling'):
+                        self._scaler = fit_scaler(data)
+                        scaled_data = self._scaler.transform(data)
+                        data = pd.DataFrame(scaled_data, index=data.index, columns=data.columns)
             else:
-                self._filter = list(data.keys())
-            if self._scaling:
-                scaled_data = self._scaler.fit_transform(data)
-                data = pd.DataFrame(scaled_data, index=data.index, columns=data.columns)
-            self.training_data = data
-            self.model.fit(data.power, exogenous=data.drop('power', axis=1))
-        else:
-            data = data.filter(['power'])
+                data = data.filter(['power'])
 
-            if self._scaling:
-                scaled_data = self._scaler.fit_transform(data)
-                data = pd.DataFrame(scaled_data, index=data.index, columns=['power'])
+                if self._scaling:
+                    with instrumentation.stage('scaling'):
+                        self._scaler = fit_scaler(data)
+                        scaled_data = self._scaler.transform(data)
+                        data = pd.DataFrame(scaled_data, index=data.index, columns=['power'])
             self.training_data = data
-            self.model.fit(data.power)
+            with instrumentation.stage('optimizer') as optimizer:
+                start = time.perf_counter()
+                self.model.fit(data.power, **pmdarima_compat.exogenous(self._exogenous(data)))
+                self.fit_time = time.perf_counter() - start
+                optimizer.record(hours=len(data), warm_start=start_params is not None, **instrumentation.optimizer_fields(self.model.arima_res_))
+        self.fit_iterations = (getattr(self.model.arima_res_, 'mle_retvals', None) or {}).get('iterations')
 
+    def warm_start_params(self, order, seasonal_order, filter=None, use_exogenous=True, fourier_terms=None):
+        """
+        Fitted parameters of this model as start parameters for a fit with the given arguments
+
+        raises: ValueError if the model was not fit with the same orders and features
+        """
+        if self.model is None: raise TypeError('The model has to be fit before its parameters can be used as start parameters')
+        features = filter + ['power'] if use_exogenous and filter else None
+        same_features = self.use_exogenous == use_exogenous and (not use_exogenous or features is None or features == self._filter)
+        same_features = same_features and self.fourier_terms == fourier_terms
+        if tuple(self.model.order) != tuple(order) or tuple(self.model.seasonal_order) != tuple(seasonal_order) or not same_features:
+            raise ValueError('start parameters can only be taken from a model fit with the same orders and features')
+        return np.asarray(self.model.arima_res_.params)
+
+    def _exogenous(self, data):
+        """
+        Exogenous regressors for scaled data: its features if exogenous variables are used and the Fourier terms if set
+        """
+        exogenous = data.drop('power', axis=1, errors='ignore') if self.use_exogenous else None
+        if not self.fourier_terms: return exogenous
+        terms = fourier_series(data.index, self.fourier_terms)
+        return terms if exogenous is None else pd.concat([exogenous, terms], axis=1)
 
-    def fit_auto(self, data, p, q, P, Q, d=None, D=None, trace=True, filter=None, use_exogenous=True):
+
+    def fit_auto(self, data, p, q, P, Q, d=None, D=None, trace=True, filter=None, use_exogenous=True, workers=None, memo=None):
         """
         Fit the model with a dataset. This method finds suitable hyperparameters in a specified range.
         If you want to fit a model with specific parameters use the 'fit' method instead.
@@ -100,11 +223,22 @@ class ARIMAModel:
                       will be ignored if use_exogenous is False
         use_exogenous: Boolean. Set whether exogenous features from 'data' should
                        be used for fitting and prediction (optional). default = True
+        workers: int. If set, all candidates in the ranges are fit in parallel with this many processes instead of
+                      the stepwise search of pmdarima. AIC and fit time of every candidate are stored in
+                      'search_results' (optional). default = None
+        memo: SearchMemo. Memo of already evaluated candidates for the parallel search, candidates evaluated
+                          on the same data before are not fit again (optional). default = arima_search.MEMO
         """
         validate_fit_auto_params([p, q, P, Q], filter, use_exogenous)
-        (start_p, max_p), (start_q, max_q), (start_P, max_P), (start_Q, max_Q) = p, q, P, Q
         self.use_exogenous = use_exogenous
+        self.fourier_terms = None
+        self._affine = None
 
+        with instrumentation.stage('arima_fit_auto'):
+            self._fit_auto(data, p, q, P, Q, d, D, trace, filter, use_exogenous, workers, memo)
+
+    def _fit_auto(self, data, p, q, P, Q, d, D, trace, filter, use_exogenous, workers, memo):
+        (start_p, max_p), (start_q, max_q), (start_P, max_P), (start_Q, max_Q) = p, q, P, Q
         if use_exogenous:
             if filter:
                 filter = filter.copy()
@@ -114,26 +248,45 @@ class ARIMAModel:
             else:
                 self._filter = list(data.keys())
             if self._scaling:
-                scaled_data = self._scaler.fit_transform(data)
-                data = pd.DataFrame(scaled_data, index=data.index, columns=data.columns)
+                with instrumentation.stage('scaling'):
+                    self._scaler = fit_scaler(data)
+                    scaled_data = self._scaler.transform(data)
+                    data = pd.DataFrame(scaled_data, index=data.index, columns=data.columns)
             self.training_data = data
-            with warnings.catch_warnings():
+            if workers is not None:
+                self._fit_search(data.power, data.drop('power', axis=1), p, q, P, Q, d, D, trace, workers, memo)
+                return
+            with warnings.catch_warnings(), instrumentation.stage('optimizer') as optimizer:
                 warnings.simplefilter('ignore')
                 self.model = auto_arima(data.power, start_p=start_p, start_q=start_q, max_p=max_p, max_q=max_q,
                                         start_P=start_P, start_Q=start_Q, max_P=max_P, max_Q=max_Q, m=24, d=d, D=D, trace=trace,
-                                        with_intercept=False, exogenous=data.drop('power', axis=1))
+                                        with_intercept=False, **pmdarima_compat.exogenous(data.drop('power', axis=1)))
+                optimizer.record(hours=len(data), search='stepwise', **instrumentation.optimizer_fields(self.model.arima_res_))
         else:
             data = data.filter(['power'])
 
             if self._scaling:
-                scaled_data = self._scaler.fit_transform(data)
-                data = pd.DataFrame(scaled_data, index=data.index, columns=['power'])
+                with instrumentation.stage('scaling'):
+                    self._scaler = fit_scaler(data)
+                    scaled_data = self._scaler.transform(data)
+                    data = pd.DataFrame(scaled_data, index=data.index, columns=['power'])
             self.training_data = data
-            with warnings.catch_warnings():
+            if workers is not None:
+                self._fit_search(data.power, None, p, q, P, Q, d, D, trace, workers, memo)
+                return
+            with warnings.catch_warnings(), instrumentation.stage('optimizer') as optimizer:
                 warnings.simplefilter('ignore')
                 self.model = auto_arima(data.power, start_p=start_p, max_p=max_p, start_q=start_q, max_q=max_q,
                                         start_P=start_P, max_P=max_P, start_Q=start_Q, max_Q=max_Q,
                                         m=24, d=d, D=D, trace=True, with_intercept=False)
+                optimizer.record(hours=len(data), search='stepwise', **instrumentation.optimizer_fields(self.model.arima_res_))
+
+    def _fit_search(self, y, exogenous, p, q, P, Q, d, D, trace, workers, memo):
+        d, D = arima_search.differencing(y, m=24, d=d, D=D)
+        candidates = arima_search.candidates(p, q, P, Q, d, D, m=24)
+        with instrumentation.stage('optimizer') as optimizer:
+            self.model, self.search_results = arima_search.search(y, exogenous, candidates, workers=workers, memo=memo, trace=trace)
+            optimizer.record(hours=len(y), search='parallel', candidates=len(candidates), **instrumentation.optimizer_fields(self.model.arima_res_))
 
     def predict(self, hours=None, testing_data=None):
         """
@@ -145,6 +298,10 @@ class ARIMAModel:
         testing_data: DataFrame. Supply if model was fit with exogenous variables. Hours of forecasting will then be according to
                                  the length of the testing_data. Ignored if model was fit without exogenous variables (optional)
         """
+        with instrumentation.stage('arima_predict'):
+            return self._predict(hours, testing_data)
+
+    def _predict(self, hours, testing_data):
         if self.use_exogenous:
             if testing_data is None: raise TypeError('Model uses exogenous variables so the testing_data parameter is mandatory')
             if hours: warnings.warn("'hours' parameter is ignored. Length of prediction will be inferred from testing_data")
@@ -155,7 +312,7 @@ class ARIMAModel:
                 data_frame = pd.DataFrame(scaled_data, index=testing_data.index, columns=testing_data.columns)
             else:
                 data_frame = testing_data
-            prediction = self.model.predict(n_periods=hours, exogenous=data_frame.drop('power', axis=1))
+            prediction = self.model.predict(n_periods=hours, **pmdarima_compat.exogenous(self._exogenous(data_frame)))
             data_frame['power'] = prediction
             if self._scaling:
                 inverse_transformed = self._scaler.inverse_transform(data_frame)
@@ -165,7 +322,7 @@ class ARIMAModel:
             if hours is None: hours = len(self.training_data)
             index_start = self.training_data.index[len(self.training_data)-1] + pd.Timedelta(hours=1)
             data_frame = pd.DataFrame(index=pd.date_range(index_start, periods=hours, freq='H'))
-            prediction = self.model.predict(n_periods=hours)
+            prediction = self.model.predict(n_periods=hours, **pmdarima_compat.exogenous(self._exogenous(data_frame)))
             if self._scaling:
                 data_frame['power'] = prediction
                 data_upscaled = self._scaler.inverse_transform(data_frame)
@@ -175,3 +332,107 @@ class ARIMAModel:
         data_frame['power'] = data_frame.power.clip(0)
         self.prediction = data_frame
         return data_frame
+
+    def predict_array(self, hours=None, testing_data=None, out=None, as_frame=False, index=None):
+        """
+        Prediction for serving loops with little overhead per call. The exogenous variables are scaled into a buffer
+        that is reused between calls and only the scaling of the power is inverted. Gives the same power as 'predict',
+        'prediction' is not set.
+
+        hours: int. Amount of predicted values if the model was fit without exogenous variables (optional)
+        testing_data: DataFrame or array. Test features if the model was fit with exogenous variables, an array needs
+                      the features in the order of the filter (optional)
+        out: array. Array the power is written to (optional). default = a new array
+        as_frame: Boolean. Whether to return a DataFrame with the column 'power' instead of an array (optional). default = False
+        index: DatetimeIndex. Predicted hours, needed for Fourier terms or 'as_frame' if 'testing_data'
+                              is an array (optional). default = index of 'testing_data' or the hours after the training data
+
+        returns: the predicted power
+        """
+        if self._affine is None:
+            self._affine = target_affine(self._scaler if self._scaling else None, list(self.training_data.columns))
+        features, mean, scale, power_mean, power_scale = self._affine
+        if self.use_exogenous:
+            if testing_data is None: raise TypeError('Model uses exogenous variables so the testing_data parameter is mandatory')
+            if isinstance(testing_data, pd.DataFrame):
+                if index is None: index = testing_data.index
+                testing_data = testing_data[features].to_numpy(dtype=float)
+            hours = len(testing_data)
+        else:
+            features = []
+            if hours is None: hours = len(self.training_data)
+        if index is None and (self.fourier_terms or as_frame):
+            if self.use_exogenous: raise TypeError('index is needed for Fourier terms or as_frame if testing_data is an array')
+            index = pd.date_range(self.training_data.index[len(self.training_data)-1] + pd.Timedelta(hours=1), periods=hours, freq='H')
+
+        exogenous = None
+        width = len(features) + 2 * (self.fourier_terms or 0)
+        if width:
+            self._buffer = buffer(self._buffer, hours, width)
+            exogenous = self._buffer[:hours]
+            if features:
+                scaled = exogenous[:, :len(features)]
+                np.subtract(testing_data, mean, out=scaled)
+                np.divide(scaled, scale, out=scaled)
+            if self.fourier_terms: fourier_values(index, self.fourier_terms, out=exogenous[:, len(features):])
+
+        if out is None: out = np.empty(hours)
+        out[:] = self.model.predict(n_periods=hours, **pmdarima_compat.exogenous(exogenous))
+        out *= power_scale
+        out += power_mean
+        np.clip(out, 0, None, out=out)
+        if as_frame: return pd.DataFrame({'power': out}, index=index)
+        return out
+
+    def rolling_forecast(self, data, horizon=24, step=24, refit_every=None):
+        """
+        Makes forecasts from a moving origin, e.g. a day-ahead forecast for every day of a year. The origin moves
+        forward over the observations in 'data' by updating the state of the fitted model with them, the parameters
+        are not estimated again unless 'refit_every' is set. The scaler fitted on the training data is kept.
+
+        data: DataFrame. Observations directly following the training data, with the same columns
+        horizon: int. Hours forecasted from every origin (optional). default = 24
+        step: int. Hours the origin moves forward between forecasts (optional). default = 24
+        refit_every: int. Re-estimate the parameters every 'refit_every' hours on the latest observations, using as many
+                          hours as the training data had and the current parameters as starting point (optional). default = never
+
+        returns: a DataFrame indexed by the forecasted hours with the columns 'origin', the first forecasted hour
+                 (all hours before it are observed), and 'power'
+        """
+        if self.model is None: raise TypeError('The model has to be fit before making rolling forecasts')
+        columns = list(self.training_data.columns)
+        observed = data.filter(columns)
+        if self._scaling: observed = pd.DataFrame(self._scaler.transform(observed), index=observed.index, columns=columns)
+        series = pd.concat([self.training_data, observed])
+        y = series.power.values
+        exogenous = self._exogenous(series)
+        if exogenous is not None: exogenous = exogenous.values
+        training_length = len(self.training_data)
+
+        origins = np.arange(0, len(observed) - horizon + 1, step)
+        segment_length = refit_every or len(observed)
+        params = np.asarray(self.model.arima_res_.params)
+        forecasts = []
+        for segment_start in range(0, len(observed), segment_length):
+            segment = origins[(origins >= segment_start) & (origins < segment_start + segment_length)]
+            if len(segment) == 0: continue
+            if segment_start > 0: # re-estimate on the latest training_length hours, warm started from the current parameters
+                window = slice(segment_start, segment_start + training_length)
+                window_model = state_space(self.model, y[window], exogenous[window] if exogenous is not None else None)
+                with warnings.catch_warnings():
+                    warnings.simplefilter('ignore')
+                    params = window_model.fit(start_params=params, disp=False).params
+            end = training_length + segment[len(segment)-1] + horizon
+            state_model = state_space(self.model, y[segment_start:end], exogenous[segment_start:end] if exogenous is not None else None)
+            forecasts.append(state_forecasts(state_model, params, segment + training_length - segment_start, horizon))
+        forecasts = np.concatenate(forecasts, axis=1) if forecasts else np.empty((horizon, 0))
+
+        power = forecasts.T.reshape(-1)
+        if self._scaling:
+            position = columns.index('power')
+            power = power * self._scaler.scale_[position] + self._scaler.mean_[position]
+        times = (origins[:, np.newaxis] + np.arange(horizon)).reshape(-1)
+        prediction = pd.DataFrame({'origin': observed.index[np.repeat(origins, horizon)], 'power': np.clip(power, 0, None)},
+                                  index=observed.index[times])
+        self.prediction = prediction
+        return prediction
@@ -0,0 +1,148 @@
+from concurrent.futures import ProcessPoolExecutor
+from pmdarima import ARIMA
+from pmdarima.arima.utils import ndiffs, nsdiffs
+from pmdarima.utils import diff
+from predictors.scaling import fingerprint
+from predictors import pmdarima_compat
+import instrumentation
+import multiprocessing
+import pandas as pd
+import itertools
+import warnings
+import tempfile
+import json
+import time
+import os
+
+class SearchMemo:
+    """
+    ----------------------------
+    ###### Search Memo ######
+    ----------------------------
+
+    Remembers the AIC and fit time of every evaluated ARIMA candidate per
+    (data fingerprint, order, seasonal_order), so searches over the same data only fit
+    candidates that have not been evaluated yet.
+
+    path: str. json file the results are persisted in, so they survive between runs. Every update
+               merges the results stored in the file by other memos or processes in the meantime, only
+               updates at the same moment can drop each other's results, which are then fit again (optional).
+               default = results are only kept in memory
+    """
+    def __init__(self, path=None):
+        self.path = path
+        self._results = self._stored()
+
+    def _stored(self):
+        if self.path is None or not os.path.exists(self.path): return {}
+        with open(self.path) as file:
+            return json.load(file)
+
+    @staticmethod
+    def key(data_fingerprint, order, seasonal_order):
+        return f'{data_fingerprint}|{tuple(order)}|{tuple(seasonal_order)}'
+
+    def get(self, data_fingerprint, order, seasonal_order):
+        return self._results.get(self.key(data_fingerprint, order, seasonal_order))
+
+    def update(self, data_fingerprint, results):
+        """
+        results: list. (order, seasonal_order, result) tuples, result is a dict with 'aic' and 'fit_seconds'
+        """
+        for order, seasonal_order, result in results:
+            self._results[self.key(data_fingerprint, order, seasonal_order)] = result
+        if self.path is None: return
+        stored = self._stored() # re-read, so results saved since this memo was loaded are kept
+        stored.update(self._results)
+        self._results = stored
+        directory = os.path.dirname(os.path.abspath(self.path))
+        descriptor, temporary = tempfile.mkstemp(suffix='.tmp', dir=directory)
+        with os.fdopen(descriptor, 'w') as file:
+            json.dump(self._results, file)
+        os.replace(temporary, self.path)
+
+MEMO = SearchMemo() # used if no other memo is passed
+
+def candidates(p, q, P, Q, d, D, m=24, max_order=5):
+    """
+    All (order, seasonal_order) combinations of the (start, max) ranges, bounds inclusive like in auto_arima.
+    Candidates with p+q+P+Q > max_order are left out, as auto_arima does.
+    """
+    ranges = [range(start, stop + 1) for start, stop in [p, q, P, Q]]
+    return [((p, d, q), (P, D, Q, m)) for p, q, P, Q in itertools.product(*ranges) if p + q + P + Q <= max_order]
+
+def differencing(y, m, d=None, D=None):
+    """
+    Determines the amount of (seasonal) differencing with the same tests auto_arima uses
+    if d or D are not specified
+    """
+    if D is None: D = nsdiffs(y, m=m, max_D=1, test='ocsb')
+    if d is None:
+        differenced = diff(y, lag=m, differences=D) if D > 0 else y
+        d = ndiffs(differenced, max_d=2, test='kpss')
+    return d, D
+
+def fit_candidate(y, exogenous, order, seasonal_order):
+    """
+    Fits one candidate and returns its AIC and fit time. Failing candidates get an AIC of NaN.
+    """
+    start = time.perf_counter()
+    with warnings.catch_warnings(), instrumentation.stage('candidate') as candidate:
+        warnings.simplefilter('ignore')
+        candidate.record(order=order, seasonal_order=seasonal_order)
+        try:
+            model = ARIMA(order=order, seasonal_order=seasonal_order, with_intercept=False)
+            model.fit(y, **pmdarima_compat.exogenous(exogenous))
+            aic = float(model.aic())
+            candidate.record(aic=aic, **instrumentation.optimizer_fields(model.arima_res_))
+        except Exception:
+            aic = float('nan')
+    return {'aic': aic, 'fit_seconds': round(time.perf_counter() - start, 3)}
+
+def search(y, exogenous, candidates, workers=None, memo=None, trace=False):
+    """
+    Evaluates all candidates in a process pool and fits the one with the lowest AIC.
+    Candidates already in the memo are not fit again.
+
+    y: Series. Target values
+    exogenous: DataFrame. Exogenous features or None
+    candidates: list. (order, seasonal_order) tuples, see 'candidates'
+    workers: int. Amount of worker processes (optional). default = amount of cpu cores
+    memo: SearchMemo. Memo for the results (optional). default = MEMO
+    trace: Boolean. Whether the result of every candidate should be printed (optional). default = False
+
+    returns: the fitted best model and a DataFrame with order, seasonal_order, aic, fit_seconds and
+             cached (whether the result came from the memo) for every candidate
+    """
+    if memo is None: memo = MEMO
+    data = y.to_frame() if exogenous is None else pd.concat([y, exogenous], axis=1)
+    data_fingerprint = fingerprint(data)
+
+    results = {candidate: memo.get(data_fingerprint, *candidate) for candidate in candidates}
+    missing = [candidate for candidate, result in results.items() if result is None]
+    if workers is None: workers = os.cpu_count()
+    if missing:
+        if workers == 1 or len(missing) == 1:
+            fitted = [fit_candidate(y, exogenous, *candidate) for candidate in missing]
+        else:
+            context = multiprocessing.get_context('fork') if 'fork' in multiprocessing.get_all_start_methods() else None
+            with ProcessPoolExecutor(max_workers=min(workers, len(missing)), mp_context=context) as executor:
+                futures = [executor.submit(fit_candidate, y, exogenous, *candidate) for candidate in missing]
+                fitted = [future.result() for future in futures]
+        memo.update(data_fingerprint, [(order, seasonal_order, result) for (order, seasonal_order), result in zip(missing, fitted)])
+        results.update(zip(missing, fitted))
+
+    rows = []
+    for (order, seasonal_order), result in results.items():
+        rows.append({'order': order, 'seasonal_order': seasonal_order, 'aic': result['aic'],
+                     'fit_seconds': result['fit_seconds'], 'cached': (order, seasonal_order) not in missing})
+        if trace: print(f"ARIMA{order}x{seasonal_order}: AIC={result['aic']}, {result['fit_seconds']}s{' (cached)' if rows[-1]['cached'] else ''}")
+    table = pd.DataFrame(rows)
+    if table.aic.isna().all(): raise ValueError('none of the ARIMA candidates could be fit')
+
+    best = table.loc[table.aic.idxmin()]
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        model = ARIMA(order=best.order, seasonal_order=best.seasonal_order, with_intercept=False)
+        model.fit(y, **pmdarima_compat.exogenous(exogenous))
+    return model, table.sort_values('aic').reset_index(drop=True)
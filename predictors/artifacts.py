@@ -0,0 +1,232 @@
+from statsmodels.tsa.statespace.sarimax import SARIMAX
+from sklearn.svm import SVR
+from sklearn.kernel_approximation import Nystroem
+from predictors.arima_model import ARIMAModel, fourier_series, sarimax_spec
+from predictors.svr_model import SVRModel
+from predictors import daylight
+import pandas as pd
+import numpy as np
+import tempfile
+import json
+import os
+
+FORMAT = 'photovoltaic-power-prediction'
+VERSION = 2 # increased whenever the stored fields change, older versions stay loadable
+
+def _write(path, meta, arrays):
+    meta = {'format': FORMAT, 'version': VERSION, **meta}
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    descriptor, temporary = tempfile.mkstemp(suffix='.tmp', dir=directory)
+    with os.fdopen(descriptor, 'wb') as file:
+        np.savez(file, meta=np.array(json.dumps(meta)), **arrays)
+    os.replace(temporary, path)
+
+def _read(path):
+    with np.load(path, allow_pickle=False) as file:
+        meta = json.loads(str(file['meta']))
+        arrays = {key: file[key] for key in file.files if key != 'meta'}
+    if meta.get('format') != FORMAT: raise ValueError(f'{path} is not a model artifact')
+    if meta['version'] > VERSION: raise ValueError(f"{path} has version {meta['version']}, this version can only read up to {VERSION}")
+    return meta, arrays
+
+def _scaling(model, scaled):
+    if not scaled: return {}
+    return {'scaler_mean': model._scaler.mean_, 'scaler_scale': model._scaler.scale_}
+
+def kernel(name, X, Y, gamma, degree=3, coef0=0.0):
+    """
+    Kernel matrix between the rows of X and Y like sklearn.metrics.pairwise_kernels
+
+    name: str. 'rbf', 'linear', 'poly' or 'sigmoid'
+    """
+    if name == 'rbf':
+        distances = (X * X).sum(axis=1)[:, np.newaxis] - 2 * X @ Y.T + (Y * Y).sum(axis=1)[np.newaxis, :]
+        np.maximum(distances, 0, out=distances)
+        return np.exp(-gamma * distances)
+    products = X @ Y.T
+    if name == 'linear': return products
+    if name == 'poly': return (gamma * products + coef0) ** degree
+    if name == 'sigmoid': return np.tanh(gamma * products + coef0)
+    raise TypeError(f"kernel '{name}' is not supported")
+
+def save(model, path):
+    """
+    Stores what a fitted ARIMAModel or SVRModel needs for predicting in one versioned .npz file with JSON metadata.
+    Training data, base data and predictions are not stored. Use 'load' to read the artifact.
+
+    model: ARIMAModel or SVRModel. A fitted model
+    path: str. File to write, e.g. 'out/models/car_2014_jan.npz'
+    """
+    if isinstance(model, ARIMAModel): meta, arrays = _arima_fields(model)
+    elif isinstance(model, SVRModel): meta, arrays = _svr_fields(model)
+    else: raise TypeError('only ARIMAModel and SVRModel can be saved')
+    _write(path, meta, arrays)
+
+def load(path):
+    """
+    Loads an artifact written with 'save'
+
+    returns: an ARIMAArtifact or SVRArtifact, which predict like the saved model
+    """
+    meta, arrays = _read(path)
+    if meta['model'] == 'arima': return ARIMAArtifact(meta, arrays)
+    if meta['model'] == 'svr': return SVRArtifact(meta, arrays)
+    raise ValueError(f"{path} contains the unknown model '{meta['model']}'")
+
+def _arima_fields(model):
+    if model.model is None: raise TypeError('The model has to be fit before it can be saved')
+    spec = sarimax_spec(model.model)
+    results = model.model.arima_res_
+    spec['trend_offset'] = getattr(results.model, 'trend_offset', 1) + results.nobs # time trends continue after the training data
+    training = model.training_data
+    meta = {
+        'model': 'arima',
+        'spec': spec,
+        'columns': list(training.columns),
+        'use_exogenous': model.use_exogenous,
+        'fourier_terms': model.fourier_terms,
+        'scaling': model._scaling,
+        'last_time': str(training.index[len(training)-1]),
+        'training_hours': len(training),
+    }
+    arrays = {
+        'params': np.asarray(results.params),
+        'state': results.filter_results.predicted_state[:, -1], # state of the first hour after the training data
+        'state_cov': results.filter_results.predicted_state_cov[:, :, -1],
+        **_scaling(model, model._scaling),
+    }
+    return meta, arrays
+
+def _svr_fields(model):
+    if model.model is None: raise TypeError('The model has to be fit before it can be saved')
+    meta = {'model': 'svr', 'columns': list(model._filter), 'scaling': model.scaling}
+    if model.daylight is not None: meta['daylight'] = model.daylight.to_dict()
+    arrays = _scaling(model, model.scaling)
+    if isinstance(model.model, SVR):
+        svr = model.model
+        meta.update({'estimator': 'svr', 'kernel': svr.kernel, 'gamma': float(svr._gamma), 'degree': svr.degree, 'coef0': svr.coef0})
+        arrays.update({'support_vectors': svr.support_vectors_, 'dual_coef': svr.dual_coef_.ravel(), 'intercept': svr.intercept_})
+    else: # kernel approximation pipeline
+        features, regressor = model.model.steps[0][1], model.model.steps[1][1]
+        arrays.update({'coef': regressor.coef_, 'intercept': np.atleast_1d(regressor.intercept_)})
+        if isinstance(features, Nystroem):
+            meta.update({'estimator': 'nystroem', 'kernel': features.kernel, 'gamma': features.gamma,
+                         'degree': features.degree if features.degree is not None else 3,
+                         'coef0': features.coef0 if features.coef0 is not None else 1})
+            arrays.update({'components': features.components_, 'normalization': features.normalization_})
+        else:
+            meta.update({'estimator': 'fourier', 'n_components': features.n_components})
+            arrays.update({'random_weights': features.random_weights_, 'random_offset': features.random_offset_})
+    return meta, arrays
+
+class _Artifact:
+    def __init__(self, meta, arrays):
+        self.meta = meta
+        self.prediction = None
+        self._columns = meta['columns']
+        self._power = self._columns.index('power')
+        self._features = [column for column in self._columns if column != 'power']
+        self._mean = arrays.get('scaler_mean')
+        self._scale = arrays.get('scaler_scale')
+
+    def _scaled_features(self, data):
+        values = data[self._features].to_numpy(dtype=float)
+        if self._mean is None: return values
+        positions = [self._columns.index(column) for column in self._features]
+        return (values - self._mean[positions]) / self._scale[positions]
+
+    def _unscaled_power(self, power):
+        if self._mean is not None: power = power * self._scale[self._power] + self._mean[self._power]
+        return np.clip(power, 0, None)
+
+class ARIMAArtifact(_Artifact):
+    """
+    ---------------------------
+    ###### ARIMA Artifact ######
+    ---------------------------
+
+    Predicts like the saved ARIMAModel from its parameters and the Kalman filter state after the training data.
+    Forecasting filters the forecasted hours as missing observations, starting from the stored state.
+    """
+    def __init__(self, meta, arrays):
+        super().__init__(meta, arrays)
+        self._spec = dict(meta['spec'], order=tuple(meta['spec']['order']), seasonal_order=tuple(meta['spec']['seasonal_order']))
+        self._params = arrays['params']
+        self._state = arrays['state']
+        self._state_cov = arrays['state_cov']
+        self.use_exogenous = meta['use_exogenous']
+        self.fourier_terms = meta['fourier_terms']
+
+    def predict(self, hours=None, testing_data=None):
+        """
+        Same as ARIMAModel.predict: pass 'testing_data' if the model uses exogenous variables, otherwise 'hours'.
+        The forecast starts at the first hour after the training data.
+        """
+        if self.use_exogenous:
+            if testing_data is None: raise TypeError('Model uses exogenous variables so the testing_data parameter is mandatory')
+            index = testing_data.index
+            exogenous = [self._scaled_features(testing_data)]
+        else:
+            if hours is None: hours = self.meta['training_hours']
+            index = pd.date_range(pd.Timestamp(self.meta['last_time']) + pd.Timedelta(hours=1), periods=hours, freq='H')
+            exogenous = []
+        if self.fourier_terms: exogenous.append(fourier_series(index, self.fourier_terms).values)
+        exogenous = np.hstack(exogenous) if exogenous else None
+
+        model = SARIMAX(np.full(len(index), np.nan), exog=exogenous, **self._spec)
+        model.initialize_known(self._state, self._state_cov)
+        forecasts = model.filter(self._params).filter_results.forecasts[0]
+        power = self._unscaled_power(forecasts)
+
+        if self.use_exogenous:
+            data_frame = testing_data.filter(self._columns).copy()
+            data_frame['power'] = power
+        else:
+            data_frame = pd.DataFrame({'power': power}, index=index)
+        self.prediction = data_frame
+        return data_frame
+
+class SVRArtifact(_Artifact):
+    """
+    ---------------------------
+    ###### SVR Artifact ######
+    ---------------------------
+
+    Predicts like the saved SVRModel with NumPy only, from the support vectors and dual
+    coefficients or the kernel approximation and linear coefficients.
+    """
+    def __init__(self, meta, arrays):
+        super().__init__(meta, arrays)
+        self._arrays = arrays
+        self.daylight = daylight.from_dict(meta['daylight']) if meta.get('daylight') else None # versions before 2 have no mask
+
+    def decision_function(self, features):
+        """
+        Scaled power for scaled features
+        """
+        meta, arrays = self.meta, self._arrays
+        if meta['estimator'] == 'svr':
+            similarities = kernel(meta['kernel'], features, arrays['support_vectors'], meta['gamma'], meta['degree'], meta['coef0'])
+            return similarities @ arrays['dual_coef'] + arrays['intercept'][0]
+        if meta['estimator'] == 'nystroem':
+            similarities = kernel(meta['kernel'], features, arrays['components'], meta['gamma'], meta['degree'], meta['coef0'])
+            mapped = similarities @ arrays['normalization'].T
+        else:
+            mapped = np.cos(features @ arrays['random_weights'] + arrays['random_offset']) * np.sqrt(2 / meta['n_components'])
+        return mapped @ arrays['coef'] + arrays['intercept'][0]
+
+    def predict(self, data):
+        """
+        Same as SVRModel.predict
+        """
+        if self.daylight is None:
+            power = self._unscaled_power(self.decision_function(self._scaled_features(data)))
+        else:
+            hours = self.daylight(data.index)
+            power = np.zeros(len(data))
+            if hours.any(): power[hours] = self._unscaled_power(self.decision_function(self._scaled_features(data[hours])))
+        data_frame = data.filter(self._columns).copy()
+        data_frame['power'] = power
+        self.prediction = data_frame
+        return data_frame
@@ -0,0 +1,112 @@
+from predictors.svr_model import SVRModel
+from predictors.artifacts import SVRArtifact
+from sklearn.svm import SVR
+import pandas as pd
+import numpy as np
+
+BLOCK_SIZE = 2048 # input rows per kernel block, the block buffer has BLOCK_SIZE x support vectors values
+
+class CompiledSVR:
+    """
+    ---------------------------
+    ###### Compiled SVR ######
+    ---------------------------
+
+    NumPy-only predictor for a fitted rbf SVRModel. The scaling of the features is folded into the
+    support vectors and per-feature kernel weights, and the scaling of the power into the dual coefficients
+    and intercept, so raw feature values go straight into the kernel and the result is the power in watts:
+
+        power = max(0, sum_i alpha_i * exp(-sum_j w_j * (x_j - c_ij)^2) + b)
+
+    with c the support vectors in raw units and w_j = gamma / scale_j^2. The kernel is evaluated in blocks
+    of input rows into one preallocated buffer, so use one instance per thread. Use 'compile_svr' to create it.
+    With the daylight mask of the model, night hours are set to zero without evaluating the kernel.
+    """
+    def __init__(self, features, centers, weights, dual_coef, intercept, block_size=BLOCK_SIZE, daylight=None):
+        self.features = features
+        self.block_size = block_size
+        self.daylight = daylight
+        self._weighted_centers = centers * weights # c_ij * w_j
+        self._center_norms = (centers * centers) @ weights # sum_j w_j * c_ij^2
+        self._weights = weights
+        self._dual_coef = dual_coef
+        self._intercept = intercept
+        self._buffer = np.empty((block_size, len(centers)))
+
+    def predict_values(self, values, out=None, index=None):
+        """
+        Predicts the power for an array of raw feature values
+
+        values: array. Rows of features in the order of 'features'
+        out: array. Array of len(values) the power is written to (optional). default = a new array
+        index: DatetimeIndex. Time index of the rows, needed if the model has a daylight mask (optional)
+
+        returns: the predicted power
+        """
+        values = np.asarray(values, dtype=float)
+        if out is None: out = np.empty(len(values))
+        if self.daylight is not None:
+            if index is None: raise TypeError('the model has a daylight mask, pass the index of the values')
+            hours = self.daylight(index)
+            out[:] = 0.0
+            out[hours] = self._predict_rows(values[hours], np.empty(hours.sum()))
+            return out
+        return self._predict_rows(values, out)
+
+    def _predict_rows(self, values, out):
+        for start in range(0, len(values), self.block_size):
+            block = values[start:start + self.block_size]
+            distances = self._buffer[:len(block)]
+            np.matmul(block, self._weighted_centers.T, out=distances)
+            distances *= -2
+            distances += ((block * block) @ self._weights)[:, np.newaxis]
+            distances += self._center_norms
+            np.maximum(distances, 0, out=distances) # rounding errors
+            np.negative(distances, out=distances)
+            np.exp(distances, out=distances)
+            np.matmul(distances, self._dual_coef, out=out[start:start + len(block)])
+        out += self._intercept
+        np.clip(out, 0, None, out=out)
+        return out
+
+    def predict(self, data):
+        """
+        Predicts the power for a DataFrame containing the features
+
+        returns: a Series with the predicted power, indexed like 'data'
+        """
+        return pd.Series(self.predict_values(data[self.features].to_numpy(dtype=float), index=data.index), index=data.index, name='power')
+
+def _svr_parameters(model):
+    if isinstance(model, SVRArtifact):
+        meta, arrays = model.meta, model._arrays
+        if meta['estimator'] != 'svr' or meta['kernel'] != 'rbf': raise TypeError('only exact rbf SVR models can be compiled')
+        columns, mean, scale = meta['columns'], arrays.get('scaler_mean'), arrays.get('scaler_scale')
+        return columns, arrays['support_vectors'], arrays['dual_coef'], arrays['intercept'][0], meta['gamma'], mean, scale, model.daylight
+    if isinstance(model, SVRModel):
+        if model.model is None: raise TypeError('The model has to be fit before it can be compiled')
+        if not isinstance(model.model, SVR) or model.model.kernel != 'rbf': raise TypeError('only exact rbf SVR models can be compiled')
+        svr = model.model
+        mean, scale = (model._scaler.mean_, model._scaler.scale_) if model.scaling else (None, None)
+        return list(model._filter), svr.support_vectors_, svr.dual_coef_.ravel(), svr.intercept_[0], float(svr._gamma), mean, scale, model.daylight
+    raise TypeError('only SVRModel and SVRArtifact can be compiled')
+
+def compile_svr(model, block_size=BLOCK_SIZE):
+    """
+    Compiles a fitted SVRModel (or a loaded SVR artifact) with an rbf kernel into a CompiledSVR
+
+    model: SVRModel or SVRArtifact
+    block_size: int. Input rows per kernel block (optional). default = BLOCK_SIZE
+    """
+    columns, support_vectors, dual_coef, intercept, gamma, mean, scale, daylight = _svr_parameters(model)
+    features = [column for column in columns if column != 'power']
+    positions = [columns.index(column) for column in features]
+    power = columns.index('power')
+    if mean is None:
+        mean, scale = np.zeros(len(columns)), np.ones(len(columns))
+
+    centers = support_vectors * scale[positions] + mean[positions] # support vectors in raw units
+    weights = gamma / scale[positions] ** 2
+    dual_coef = dual_coef * scale[power]
+    intercept = intercept * scale[power] + mean[power]
+    return CompiledSVR(features, centers, weights, dual_coef, intercept, block_size, daylight)
@@ -0,0 +1,124 @@
+from features import solar
+import numpy as np
+
+MASKS = ['solar', 'learned']
+
+class SolarMask:
+    """
+    ---------------------------
+    ###### Solar Mask ######
+    ---------------------------
+
+    Daylight mask from the position of the sun: an hour is daylight if the sun is above 'elevation' at its start
+    or at its end, so hours with a sunrise or sunset inside of them are kept. See 'solar.cos_zenith' for the location.
+
+    latitude: float. Latitude of the site in degrees, north is positive
+    longitude: float. Longitude of the site in degrees, east is positive
+    utc_offset: float. Hours the local standard time of the data is ahead of UTC (optional). default = longitude / 15
+    elevation: float. Elevation of the sun in degrees below which an hour is night (optional). default = 0
+    """
+    def __init__(self, latitude, longitude, utc_offset=None, elevation=0.0):
+        self.latitude = latitude
+        self.longitude = longitude
+        self.utc_offset = utc_offset
+        self.elevation = elevation
+
+    def __call__(self, index):
+        """
+        returns: a boolean array, True for the daylight hours of the hourly 'index'
+        """
+        threshold = np.sin(np.radians(self.elevation))
+        start = solar.cos_zenith(index, self.latitude, self.longitude, self.utc_offset, shift=0)
+        end = solar.cos_zenith(index, self.latitude, self.longitude, self.utc_offset, shift=1)
+        return (start > threshold) | (end > threshold)
+
+    def to_dict(self):
+        return {'mask': 'solar', 'latitude': self.latitude, 'longitude': self.longitude,
+                'utc_offset': self.utc_offset, 'elevation': self.elevation}
+
+class LearnedMask:
+    """
+    ---------------------------
+    ###### Learned Mask ######
+    ---------------------------
+
+    Daylight mask learned from the hours with power output in historical data, use 'learn' to create it.
+    An hour of the day is daylight on a day of the year if power was produced at that hour within 'days' days
+    of it in any year of the history, widened by 'margin' hours at sunrise and sunset. Days without history
+    in reach use the nearest day of the history.
+
+    table: array. 366 x 24 booleans, the daylight hours of every day of the year
+    """
+    def __init__(self, table):
+        self.table = np.asarray(table, dtype=bool)
+
+    @classmethod
+    def learn(cls, data, threshold=0.0, days=7, margin=1):
+        """
+        data: DataFrame. Hourly dataset including the power output, e.g. the base data or the training data
+        threshold: float. Power above which an hour counts as daylight (optional). default = 0
+        days: int. Days before and after a day whose daylight hours are included, which bridges days without
+                   output like outages (optional). default = 7
+        margin: int. Hours added before the first and after the last hour with output, for days that
+                     are longer than the ones in the history (optional). default = 1
+        """
+        day, hour = data.index.dayofyear.values - 1, data.index.hour.values
+        observed = np.zeros((366, 24), dtype=bool)
+        np.logical_or.at(observed, (day, hour), data.power.to_numpy() > threshold)
+        history = np.zeros(366, dtype=bool)
+        history[day] = True
+
+        table = np.zeros((366, 24), dtype=bool)
+        covered = np.zeros(366, dtype=bool)
+        for shift in range(-days, days + 1):
+            table |= np.roll(observed, shift, axis=0)
+            covered |= np.roll(history, shift)
+        if not covered.all():
+            distances = np.abs(np.arange(366)[:, np.newaxis] - np.flatnonzero(history)[np.newaxis, :])
+            nearest = np.flatnonzero(history)[np.minimum(distances, 366 - distances).argmin(axis=1)]
+            table[~covered] = observed[nearest[~covered]]
+
+        widened = table.copy()
+        for shift in range(1, margin + 1):
+            widened[:, shift:] |= table[:, :-shift]
+            widened[:, :-shift] |= table[:, shift:]
+        return cls(widened)
+
+    def __call__(self, index):
+        """
+        returns: a boolean array, True for the daylight hours of the hourly 'index'
+        """
+        return self.table[index.dayofyear.values - 1, index.hour.values]
+
+    def to_dict(self):
+        return {'mask': 'learned', 'table': self.table.astype(int).tolist()}
+
+def daylight_mask(daylight, data=None, location=None):
+    """
+    Creates a daylight mask
+
+    daylight: str or mask. 'solar' for a SolarMask at 'location', 'learned' for a LearnedMask learned from 'data',
+                           or a SolarMask or LearnedMask which is returned as it is
+    data: DataFrame. Historical data for 'learned' (optional)
+    location: dict. Arguments of SolarMask for 'solar', e.g. uq.LOCATION (optional)
+
+    returns: a SolarMask or LearnedMask
+    """
+    if isinstance(daylight, (SolarMask, LearnedMask)): return daylight
+    if daylight == 'solar':
+        if not location: raise TypeError("a location with latitude and longitude must be provided for daylight='solar'")
+        return SolarMask(**location)
+    if daylight == 'learned':
+        if data is None: raise TypeError("data must be provided for daylight='learned'")
+        return LearnedMask.learn(data)
+    raise TypeError(f'daylight has to be one of {MASKS}, a mask or None')
+
+def from_dict(fields):
+    """
+    returns: the mask stored with 'to_dict'
+    """
+    fields = dict(fields)
+    kind = fields.pop('mask')
+    if kind == 'solar': return SolarMask(**fields)
+    if kind == 'learned': return LearnedMask(fields['table'])
+    raise ValueError(f"unknown daylight mask '{kind}'")
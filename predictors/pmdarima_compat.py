@@ -0,0 +1,14 @@
+from pmdarima import ARIMA
+import inspect
+
+# pmdarima 1.5 renamed the 'exogenous' keyword to 'X', newer versions silently ignore 'exogenous'
+EXOGENOUS = 'X' if 'X' in inspect.signature(ARIMA.fit).parameters else 'exogenous'
+
+def exogenous(values):
+    """
+    Keyword arguments passing exogenous regressors to the fit, predict and update methods of pmdarima and auto_arima
+    in the installed version, e.g. model.fit(y, **exogenous(features))
+
+    values: DataFrame or array. Exogenous regressors or None
+    """
+    return {EXOGENOUS: values}
@@ -0,0 +1,78 @@
+from sklearn.preprocessing import StandardScaler
+from collections import OrderedDict
+import pandas as pd
+import numpy as np
+import threading
+import hashlib
+
+CACHE_SIZE = 256 # amount of fitted scalers kept in memory
+
+_scalers = OrderedDict()
+_lock = threading.Lock()
+
+def fingerprint(data):
+    """
+    Hash of the values, index and columns of a DataFrame. Equal data gives an equal fingerprint.
+
+    data: DataFrame
+    """
+    digest = hashlib.sha1(pd.util.hash_pandas_object(data, index=True).values.tobytes())
+    digest.update(repr(list(data.columns)).encode('utf-8'))
+    return digest.hexdigest()
+
+def fit_scaler(data, filter=None, data_fingerprint=None):
+    """
+    Fits a StandardScaler on the data. Fitted scalers are cached by the fingerprint of the
+    data and the filter, so repeated fits on the same data reuse the fitted mean and scale.
+    The returned scaler is shared, it must not be fit again.
+
+    data: DataFrame. Data to fit the scaler on
+    filter: list. Columns of 'data' to use (optional). default = all columns
+    data_fingerprint: str. Fingerprint of 'data' if it is already known, saves hashing the data (optional)
+    """
+    if data_fingerprint is None: data_fingerprint = fingerprint(data)
+    key = (data_fingerprint, tuple(filter) if filter is not None else None)
+    with _lock:
+        scaler = _scalers.get(key)
+        if scaler is not None:
+            _scalers.move_to_end(key)
+            return scaler
+
+    scaler = StandardScaler()
+    scaler.fit(data.filter(filter) if filter is not None else data)
+    with _lock:
+        _scalers[key] = scaler
+        if len(_scalers) > CACHE_SIZE: _scalers.popitem(last=False)
+    return scaler
+
+def clear_scalers():
+    """
+    Removes all cached scalers
+    """
+    with _lock:
+        _scalers.clear()
+
+def target_affine(scaler, columns, target='power'):
+    """
+    Splits the parameters of a fitted scaler into the part of the features and the part of the target,
+    so features can be scaled and the target unscaled on plain arrays without transforming all columns
+
+    scaler: StandardScaler. Scaler fitted on 'columns' or None for unscaled data
+    columns: list. Columns the scaler was fitted on, including the target
+
+    returns: (features, feature_mean, feature_scale, target_mean, target_scale) where features are
+             the columns without the target
+    """
+    features = [column for column in columns if column != target]
+    if scaler is None: return features, np.zeros(len(features)), np.ones(len(features)), 0.0, 1.0
+    positions = [columns.index(column) for column in features]
+    target_position = columns.index(target)
+    return features, scaler.mean_[positions], scaler.scale_[positions], scaler.mean_[target_position], scaler.scale_[target_position]
+
+def buffer(current, rows, columns):
+    """
+    Returns a (rows x columns) view of 'current' if it is large enough, otherwise a new array to be kept for the next call
+    """
+    if current is None or current.shape[0] < rows or current.shape[1] != columns:
+        current = np.empty((max(rows, 1), columns))
+    return current
@@ -1,16 +1,41 @@
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
+import numpy as np
 from sklearn.svm import SVR
-from sklearn.preprocessing import StandardScaler
+from sklearn.linear_model import SGDRegressor
+from sklearn.kernel_approximation import Nystroem, RBFSampler
+from sklearn.pipeline import make_pipeline
+from predictors.scaling import fingerprint, fit_scaler, target_affine, buffer
+from predictors.daylight import daylight_mask
+import instrumentation
 import warnings
+import os
+
+APPROXIMATIONS = ['nystroem', 'fourier']
 
 def validate_init(base_data, scaling):
     if base_data is None and scaling:
         raise TypeError('if scaling is activated, a dataframe containing sample data must be provided for fitting the scaler')
 
-def fit_scaler(data):
-    scaler = StandardScaler()
-    scaler.fit(data)
-    return scaler
+def validate_approximation(approximation, kernel):
+    if approximation is not None and approximation not in APPROXIMATIONS:
+        raise TypeError(f'approximation has to be one of {APPROXIMATIONS} or None')
+    if approximation == 'fourier' and kernel != 'rbf':
+        raise TypeError("random fourier features can only approximate the 'rbf' kernel")
+
+def approximate_svr(approximation, kernel, C, gamma, epsilon, n_components, n_samples):
+    """
+    Builds a pipeline that maps the features into an approximated kernel space and fits
+    a linear epsilon-insensitive regression there with stochastic gradient descent.
+    The cost is linear in the amount of samples. alpha = 1 / (C * n_samples) gives
+    the same objective as the penalty parameter C of the SVR.
+    """
+    if approximation == 'nystroem':
+        features = Nystroem(kernel=kernel, gamma=gamma, n_components=n_components, random_state=0)
+    else:
+        features = RBFSampler(gamma=gamma, n_components=n_components, random_state=0)
+    regressor = SGDRegressor(loss='epsilon_insensitive', epsilon=epsilon, alpha=1 / (C * n_samples), max_iter=100, random_state=0)
+    return make_pipeline(features, regressor)
 
 class SVRModel:
     """
@@ -28,14 +53,19 @@ class SVRModel:
     def __init__(self, base_data=None, scaling=True):
         validate_init(base_data, scaling)
         self._base_data = base_data
+        self._base_fingerprint = None
         self._scaler = None
         self._filter = None
+        self._affine = None
+        self._buffer = None
 
         self.model = None
         self.scaling = scaling
+        self.daylight = None
         self.prediction = None
 
-    def fit(self, data, filter=None, kernel='rbf', C=1e3, gamma=0.1, epsilon=0.1):
+    def fit(self, data, filter=None, kernel='rbf', C=1e3, gamma=0.1, epsilon=0.1, approximation=None, n_components=300,
+            daylight=None, location=None):
         """
         Fit the model with a dataset.
 
@@ -46,22 +76,58 @@ class SVRModel:
         C: float. Penalty Parameter (optional). default = 1e3
         gamma: float. Kernel coefficient (optional). default = 0.1
         epsilon: float. Epsilon-tube distance (optional). default = 0.1
+        approximation: str. Approximate the kernel with 'nystroem' or random 'fourier' features (rbf kernel only)
+                            and fit a linear epsilon-insensitive regression on them instead of the exact SVR.
+                            Use this for long training windows, the exact SVR scales quadratically to cubically
+                            with the amount of training hours (optional). default = None
+        n_components: int. Dimension of the approximated kernel space (optional). default = 300
+        daylight: str. Train only on daylight hours and predict exactly zero for the night hours without evaluating
+                       the model: 'solar' computes the daylight hours from the position of the sun at 'location',
+                       'learned' learns them from the hours with power in the training data and the base data before
+                       it, see 'history'. A SolarMask or LearnedMask can be passed as well (optional). default = None
+        location: dict. latitude, longitude and utc_offset of the site for daylight='solar', e.g. uq.LOCATION (optional)
+        """
+        validate_approximation(approximation, kernel)
+        self._affine = None
+        with instrumentation.stage('svr_fit') as stage:
+            self._fit(data, filter, kernel, C, gamma, epsilon, approximation, n_components, daylight, location)
+            stage.record(hours=len(data), approximation=approximation)
+
+    def history(self, data):
         """
+        Power observed up to the end of the training data 'data': the base data before the training data and the
+        training data itself. Base data that reaches into later hours, like the whole dataset used as base data in
+        backtests, is cut at the start of the training data, so the forecasted hours never affect a learned mask.
+        """
+        if self._base_data is None: return data.filter(['power'])
+        earlier = self._base_data[self._base_data.index < data.index[0]]
+        return pd.concat([earlier.filter(['power']), data.filter(['power'])])
+
+    def _fit(self, data, filter, kernel, C, gamma, epsilon, approximation, n_components, daylight, location):
         if filter:
             filter = filter.copy()
             filter.append('power')
         else: filter = list(data.keys())
         self._filter = filter
+        self.daylight = None
+        if daylight is not None:
+            self.daylight = daylight_mask(daylight, self.history(data), location)
+            data = data[self.daylight(data.index)]
         data = data.filter(filter)
 
         if self.scaling:
-            self._scaler = fit_scaler(self._base_data.filter(filter))
-            scaled_values = self._scaler.transform(data)
-            data_frame = pd.DataFrame(scaled_values, index=data.index, columns=data.columns)
+            with instrumentation.stage('scaling'):
+                if self._base_fingerprint is None: self._base_fingerprint = fingerprint(self._base_data)
+                self._scaler = fit_scaler(self._base_data, filter, self._base_fingerprint)
+                scaled_values = self._scaler.transform(data)
+                data_frame = pd.DataFrame(scaled_values, index=data.index, columns=data.columns)
         else:
             data_frame = data
 
-        self.model = SVR(kernel=kernel, C=C, gamma=gamma, epsilon=epsilon)
+        if approximation:
+            self.model = approximate_svr(approximation, kernel, C, gamma, epsilon, n_components, len(data_frame))
+        else:
+            self.model = SVR(kernel=kernel, C=C, gamma=gamma, epsilon=epsilon)
         self.model.fit(data_frame.drop('power', axis=1), data_frame.power)
 
     def predict(self, data):
@@ -71,6 +137,10 @@ class SVRModel:
 
         data: DataFrame. Dataset including all test features
         """
+        with instrumentation.stage('svr_predict'):
+            return self._predict(data)
+
+    def _predict(self, data):
         data = data.filter(self._filter)
 
         if self.scaling:
@@ -79,11 +149,147 @@ class SVRModel:
         else:
             data_frame = data
 
-        prediction = self.model.predict(data_frame.drop('power', axis=1))
-        data_frame['power'] = prediction
+        features = data_frame.drop('power', axis=1)
+        if self.daylight is None:
+            data_frame['power'] = self.model.predict(features)
+        else:
+            daylight = self.daylight(data.index)
+            prediction = np.zeros(len(features))
+            if daylight.any(): prediction[daylight] = self.model.predict(features[daylight])
+            data_frame['power'] = prediction
         if self.scaling:
             inversed = self._scaler.inverse_transform(data_frame)
             data_frame = pd.DataFrame(inversed, index=data_frame.index, columns=data_frame.columns)
         data_frame['power'] = data_frame.power.clip(0)
+        if self.daylight is not None: data_frame.loc[~daylight, 'power'] = 0.0 # exact zeros at night
         self.prediction = data_frame
         return data_frame
+
+    def predict_array(self, data, out=None, as_frame=False, index=None):
+        """
+        Prediction for serving loops with little overhead per call. The features are scaled into a buffer that
+        is reused between calls and only the scaling of the power is inverted. Gives the same power as 'predict',
+        'prediction' is not set.
+
+        data: DataFrame or array. Test features, an array needs the features in the order of the filter
+        out: array. Array of len(data) the power is written to (optional). default = a new array
+        as_frame: Boolean. Whether to return a DataFrame with the column 'power' indexed like 'data'
+                           instead of an array, 'data' needs to be a DataFrame then (optional). default = False
+        index: DatetimeIndex. Time index of the rows of an array, needed if the model has a daylight mask
+                              (optional). default = the index of 'data' if it is a DataFrame
+
+        returns: the predicted power
+        """
+        if self._affine is None: self._affine = target_affine(self._scaler if self.scaling else None, self._filter)
+        features, mean, scale, power_mean, power_scale = self._affine
+        values = data[features].to_numpy(dtype=float) if isinstance(data, pd.DataFrame) else data
+        if out is None: out = np.empty(len(values))
+        if self.daylight is not None:
+            if index is None and not isinstance(data, pd.DataFrame): raise TypeError('the model has a daylight mask, pass the index of the array')
+            daylight = self.daylight(data.index if index is None else index)
+            values, full = values[daylight], out
+            out = np.empty(len(values))
+
+        self._buffer = buffer(self._buffer, len(values), len(features))
+        scaled = self._buffer[:len(values)]
+        np.subtract(values, mean, out=scaled)
+        np.divide(scaled, scale, out=scaled)
+        if len(values): out[:] = self.model.predict(scaled)
+        out *= power_scale
+        out += power_mean
+        np.clip(out, 0, None, out=out)
+        if self.daylight is not None:
+            full[:] = 0.0
+            full[daylight] = out
+            out = full
+        if as_frame: return pd.DataFrame({'power': out}, index=data.index)
+        return out
+
+class SVRBatch:
+    """
+    ---------------------------
+    ###### SVR Batch ######
+    ---------------------------
+
+    Fits and evaluates many independent SVR models at once, e.g. one per site and window.
+    Selecting, scaling and unscaling the data is done for all cells together on stacked
+    NumPy arrays and the fits run in a thread pool (libsvm releases the GIL while fitting).
+    Each cell gives the same prediction as an SVRModel with the same parameters.
+
+    filter: list. Set the features that you want to use for the regression (optional)
+    scaling: Boolean. Whether the data should be scaled before using the SVR algorithm (optional). default = true
+    workers: int. Amount of threads (optional). default = amount of cpu cores
+    params: further keyword arguments for the SVR (kernel, C, gamma, epsilon). default = same as SVRModel.fit
+    """
+    def __init__(self, filter=None, scaling=True, workers=None, **params):
+        self.filter = filter
+        self.scaling = scaling
+        self.workers = workers
+        self.params = {'kernel': 'rbf', 'C': 1e3, 'gamma': 0.1, 'epsilon': 0.1, **params}
+        self.models = None
+        self.prediction = None
+
+    def run(self, cells, base_data=None):
+        """
+        Fits one model per cell on its training data and predicts its testing data.
+
+        cells: dict. Maps a cell key (e.g. 'stl_2014_jan') to a (training, testing) tuple of DataFrames
+        base_data: DataFrame or dict. Data for fitting the scaler, either one DataFrame for all cells or a dict
+                   mapping each cell key to its base data. Must be specified if scaling is activated
+
+        returns: a long format DataFrame with the columns 'cell', 'time' and 'power'. It can also be accessed with 'prediction'
+        """
+        validate_init(base_data, self.scaling)
+        keys = list(cells.keys())
+        first_training = cells[keys[0]][0]
+        if self.filter: columns = self.filter + ['power']
+        else: columns = [column for column in first_training.keys() if column != 'power'] + ['power'] # power is the last column below
+        features = [column for column in columns if column != 'power']
+
+        training = [cells[key][0][columns].to_numpy(dtype=float) for key in keys]
+        testing = [cells[key][1][features].to_numpy(dtype=float) for key in keys]
+        training_lengths = [len(values) for values in training]
+        testing_lengths = [len(values) for values in testing]
+        training, testing = np.concatenate(training), np.concatenate(testing)
+
+        if self.scaling:
+            means, scales = self._scaling_parameters(keys, base_data, columns)
+            training -= np.repeat(means, training_lengths, axis=0)
+            training /= np.repeat(scales, training_lengths, axis=0)
+            testing -= np.repeat(means[:, :-1], testing_lengths, axis=0)
+            testing /= np.repeat(scales[:, :-1], testing_lengths, axis=0)
+
+        training_cells = np.split(training, np.cumsum(training_lengths)[:-1])
+        testing_cells = np.split(testing, np.cumsum(testing_lengths)[:-1])
+
+        def fit_predict(position):
+            values = training_cells[position]
+            model = SVR(**self.params)
+            model.fit(values[:, :-1], values[:, -1])
+            prediction = model.predict(testing_cells[position]) if len(testing_cells[position]) else np.empty(0)
+            return model, prediction
+
+        with ThreadPoolExecutor(max_workers=self.workers or os.cpu_count()) as executor:
+            results = list(executor.map(fit_predict, range(len(keys))))
+        self.models = {key: model for key, (model, _) in zip(keys, results)}
+
+        power = np.concatenate([prediction for _, prediction in results])
+        if self.scaling:
+            power *= np.repeat(scales[:, -1], testing_lengths)
+            power += np.repeat(means[:, -1], testing_lengths)
+        np.clip(power, 0, None, out=power)
+
+        time = np.concatenate([cells[key][1].index.values for key in keys])
+        self.prediction = pd.DataFrame({'cell': np.repeat(keys, testing_lengths), 'time': time, 'power': power})
+        return self.prediction
+
+    def _scaling_parameters(self, keys, base_data, columns):
+        fingerprints = {} # the same base data is only hashed once
+        means, scales = [], []
+        for key in keys:
+            data = base_data[key] if isinstance(base_data, dict) else base_data
+            if id(data) not in fingerprints: fingerprints[id(data)] = fingerprint(data)
+            scaler = fit_scaler(data, columns, fingerprints[id(data)])
+            means.append(scaler.mean_)
+            scales.append(scaler.scale_)
+        return np.array(means), np.array(scales)
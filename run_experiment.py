@@ -0,0 +1,12 @@
+from evaluation import experiment
+import argparse
+
+# runs an experiment spec, e.g. python run_experiment.py experiments/third_run_uq.json --workers 32
+parser = argparse.ArgumentParser(description='Runs the backtest described by an experiment spec')
+parser.add_argument('spec', help='path to the json spec of the experiment')
+parser.add_argument('--workers', type=int, default=None, help='amount of worker processes, default: spec or amount of cpu cores')
+parser.add_argument('--restart', action='store_true', help='discard the results of an earlier run instead of resuming it')
+parser.add_argument('--timings', action='store_true', help='record the stages of every cell in timings.jsonl and print the slowest cells')
+args = parser.parse_args()
+
+experiment.run(experiment.load_spec(args.spec), workers=args.workers, resume=not args.restart, timings=args.timings)
@@ -0,0 +1,54 @@
+from evaluation.accumulators import ErrorAccumulator, BacktestAccumulator
+from evaluation.error_terms import batch_errors
+import pandas as pd
+import numpy as np
+import pytest
+
+METRICS = ['mse', 'rmse', 'nrmse', 'mae', 'r2']
+
+@pytest.fixture(scope='module')
+def predictions():
+    """
+    Truth and predictions of 3 sites over 3 months with missing hours, as Series per site
+    """
+    random = np.random.default_rng(0)
+    index = pd.date_range('20140101', '20140331 23:00', freq='H')
+    sites = {}
+    for site in ['car_2014', 'stl_2014', 'edwards_2014']:
+        truth = pd.Series(np.clip(random.normal(500, 300, len(index)), 0, None), index=index)
+        truth[random.random(len(index)) < 0.02] = np.nan
+        sites[site] = (truth, truth.to_numpy() + random.normal(0, 80, len(index)))
+    return sites
+
+def test_error_accumulators_merge_in_any_order():
+    random = np.random.default_rng(1)
+    y_true, y_pred = random.normal(100, 20, 1000), random.normal(100, 20, 1000)
+    chunks = [ErrorAccumulator().update(y_true[start:start + 97], y_pred[start:start + 97]) for start in range(0, 1000, 97)]
+    merged = ErrorAccumulator()
+    for position in random.permutation(len(chunks)): merged.merge(chunks[position])
+    errors, reference = merged.errors(), batch_errors(y_true, y_pred)
+    assert errors['count'] == 1000
+    for name in METRICS: assert errors[name] == pytest.approx(reference[name], rel=1e-12)
+
+def test_merged_chunks_match_the_full_series(predictions):
+    random = np.random.default_rng(2)
+    chunks = []
+    for site, (truth, predicted) in predictions.items():
+        for start in range(0, len(truth), 24 * 9): # chunks across month boundaries
+            chunks.append(BacktestAccumulator().update(site, truth[start:start + 24 * 9], predicted[start:start + 24 * 9]))
+    merged = BacktestAccumulator()
+    for position in random.permutation(len(chunks)): merged.merge(chunks[position])
+    summary = merged.summary()
+
+    truth = pd.concat([truth for truth, _ in predictions.values()])
+    predicted = np.concatenate([predicted for _, predicted in predictions.values()])
+    groups = [('total', 'all', np.ones(len(truth), dtype=bool))]
+    groups += [('site', site, np.repeat(list(predictions), len(truth) // len(predictions)) == site) for site in predictions]
+    groups += [('month', month, truth.index.month == month) for month in range(1, 4)]
+    groups += [('hour', hour, truth.index.hour == hour) for hour in range(24)]
+    assert len(summary) == len(groups)
+    for breakdown, key, selected in groups:
+        reference = batch_errors(truth.to_numpy()[selected], predicted[selected])
+        row = summary.loc[(breakdown, key)]
+        assert row['count'] == np.isfinite(truth.to_numpy()[selected]).sum()
+        for name in METRICS: assert row[name] == pytest.approx(reference[name], rel=1e-10), (breakdown, key, name)
@@ -0,0 +1,40 @@
+from predictors.arima_search import SearchMemo, candidates, search
+from importers import synthetic
+import json
+import pytest
+
+@pytest.fixture(scope='module')
+def power():
+    return synthetic.site(2, hours=24 * 7).power
+
+def test_memo_reuse_with_extended_ranges(power, tmp_path):
+    path = str(tmp_path / 'memo.json')
+    first = candidates(p=(0,1), q=(0,1), P=(0,0), Q=(0,0), d=0, D=0)
+    _, table = search(power, None, first, workers=1, memo=SearchMemo(path))
+    assert len(table) == 4 and not table.cached.any()
+
+    extended = candidates(p=(0,2), q=(0,1), P=(0,0), Q=(0,0), d=0, D=0)
+    _, table = search(power, None, extended, workers=1, memo=SearchMemo(path))
+    assert len(table) == 6
+    assert dict(zip(table.order, table.cached)) == {order: (order, seasonal_order) in first for order, seasonal_order in extended}
+    _, repeated = search(power, None, extended, workers=1, memo=SearchMemo(path))
+    assert repeated.cached.all()
+    assert repeated.aic.tolist() == table.aic.tolist() # sorted by aic
+
+    _, other_data = search(power * 2, None, first, workers=1, memo=SearchMemo(path))
+    assert not other_data.cached.any()
+
+def test_memos_sharing_a_file_keep_each_others_results(tmp_path):
+    path = str(tmp_path / 'memo.json')
+    first, second = SearchMemo(path), SearchMemo(path)
+    first.update('data', [((1,0,0), (0,0,0,24), {'aic': 1.0, 'fit_seconds': 0.1})])
+    second.update('data', [((2,0,0), (0,0,0,24), {'aic': 2.0, 'fit_seconds': 0.2})])
+    first.update('other', [((1,0,0), (0,0,0,24), {'aic': 3.0, 'fit_seconds': 0.3})])
+    with open(path) as file:
+        assert len(json.load(file)) == 3
+    reloaded = SearchMemo(path)
+    assert reloaded.get('data', (1,0,0), (0,0,0,24))['aic'] == 1.0
+    assert reloaded.get('data', (2,0,0), (0,0,0,24))['aic'] == 2.0
+    assert reloaded.get('other', (1,0,0), (0,0,0,24))['aic'] == 3.0
+    assert first.get('data', (2,0,0), (0,0,0,24))['aic'] == 2.0
+    assert SearchMemo().get('data', (1,0,0), (0,0,0,24)) is None
@@ -0,0 +1,33 @@
+from predictors.arima_model import ARIMAModel
+from predictors import artifacts
+from importers import synthetic
+import numpy as np
+import pytest
+
+FILTER = ['airtemp', 'humidity']
+
+@pytest.fixture(scope='module')
+def data():
+    return synthetic.site(4, hours=24 * 30)
+
+@pytest.mark.parametrize('use_exogenous, fourier_terms, seasonal_order', [
+    (True, None, None), (False, None, (1,0,0,24)), (True, 3, None), (False, 4, None)])
+def test_arima_round_trip(data, tmp_path, use_exogenous, fourier_terms, seasonal_order):
+    training, testing = data.iloc[:24 * 28], data.iloc[24 * 28:]
+    model = ARIMAModel()
+    model.fit(training, order=(2,0,1), seasonal_order=seasonal_order, filter=FILTER if use_exogenous else None,
+              use_exogenous=use_exogenous, fourier_terms=fourier_terms)
+    exogenous = model.model.arima_res_.model.k_exog or 0
+    assert exogenous == (len(FILTER) if use_exogenous else 0) + 2 * (fourier_terms or 0)
+
+    path = str(tmp_path / 'arima.npz')
+    artifacts.save(model, path)
+    artifact = artifacts.load(path)
+    if use_exogenous:
+        expected, loaded = model.predict(testing_data=testing), artifact.predict(testing_data=testing)
+    else:
+        expected, loaded = model.predict(hours=48), artifact.predict(hours=48)
+    power = expected.power.to_numpy()
+    assert power.max() > 0
+    assert loaded.index.equals(expected.index)
+    np.testing.assert_allclose(loaded.power.to_numpy(), power, rtol=0, atol=1e-6 * power.max())
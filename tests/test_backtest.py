@@ -0,0 +1,33 @@
+from evaluation import backtest, experiment
+import pytest
+import glob
+import os
+
+SPECS = os.path.join(os.path.dirname(__file__), '..', 'experiments')
+
+WINDOWS = [['jan', ['20140104', '20140131', '20140201', '20140202']], ['feb', ['20140201', '20140228', '20140301', '20140302']]]
+DATASETS = {'car_2014': None, 'stl_2014': None}
+
+def test_cold_cells_are_independent():
+    models = {'arima': {'model': 'arima', 'order': (2,0,1)}, 'svr': {'model': 'svr'}}
+    units = backtest.chains(backtest.cells(DATASETS, WINDOWS, models))
+    assert len(units) == 8
+    assert all(len(chain) == 1 for chain in units)
+
+def test_warm_start_chains_per_dataset():
+    models = {'arima': {'model': 'arima', 'order': (2,0,1), 'warm_start': True}, 'svr': {'model': 'svr'}}
+    units = backtest.chains(backtest.cells(DATASETS, WINDOWS, models))
+    warm = [chain for chain in units if len(chain) > 1]
+    assert len(warm) == 2
+    assert [[task[1] for task in chain] for chain in warm] == [['jan', 'feb'], ['jan', 'feb']]
+
+@pytest.mark.parametrize('model', ['svr', 'arima_auto'])
+def test_warm_start_is_rejected_for_other_models(model):
+    models = {'other': {'model': model, 'warm_start': True}}
+    with pytest.raises(ValueError, match='warm_start'):
+        backtest.chains(backtest.cells(DATASETS, WINDOWS, models))
+
+@pytest.mark.parametrize('filepath', [path for path in sorted(glob.glob(os.path.join(SPECS, '*.json'))) if 'warm_start' not in path])
+def test_reference_specs_fit_cold(filepath):
+    spec = experiment.load_spec(filepath)
+    assert not any(model.get('warm_start') for model in spec['models'].values())
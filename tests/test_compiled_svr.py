@@ -0,0 +1,51 @@
+from predictors.svr_model import SVRModel
+from predictors.compiled_svr import compile_svr
+from predictors import artifacts
+from importers import synthetic
+from sklearn.preprocessing import StandardScaler
+from sklearn.svm import SVR
+import numpy as np
+import pytest
+
+FILTER = ['tamb', 'wspd']
+PARAMS = {'kernel': 'rbf', 'C': 1e3, 'gamma': 0.1, 'epsilon': 0.1}
+
+@pytest.fixture(scope='module')
+def data():
+    return synthetic.site(2, hours=24 * 30, layout='pvwatts')
+
+def sklearn_prediction(svr, data, testing, scaling):
+    """
+    Reference prediction of the fitted sklearn SVR, scaled with a StandardScaler fit on the whole data like SVRModel.
+    The SVR is not fit again, libsvm only solves to a tolerance and tiny input differences change its solution.
+    """
+    columns = FILTER + ['power']
+    if scaling:
+        scaler = StandardScaler().fit(data[columns])
+        mean, scale = scaler.mean_, scaler.scale_
+    else:
+        mean, scale = np.zeros(len(columns)), np.ones(len(columns))
+    assert isinstance(svr, SVR)
+    power = svr.predict((testing[FILTER].to_numpy() - mean[:-1]) / scale[:-1]) * scale[-1] + mean[-1]
+    return np.clip(power, 0, None)
+
+@pytest.mark.parametrize('scaling', [True, False])
+def test_predictions_match_sklearn(data, scaling, tmp_path):
+    training, testing = data.iloc[:24 * 28], data.iloc[24 * 28:]
+    model = SVRModel(data if scaling else None, scaling=scaling)
+    model.fit(training, filter=FILTER, **PARAMS)
+    expected = sklearn_prediction(model.model, data, testing, scaling)
+    assert expected.max() > 0
+    tolerance = 1e-6 * expected.max()
+
+    np.testing.assert_allclose(model.predict(testing).power.to_numpy(), expected, rtol=0, atol=tolerance)
+    np.testing.assert_allclose(model.predict_array(testing), expected, rtol=0, atol=tolerance)
+
+    artifacts.save(model, str(tmp_path / 'svr.npz'))
+    artifact = artifacts.load(str(tmp_path / 'svr.npz'))
+    np.testing.assert_allclose(artifact.predict(testing).power.to_numpy(), expected, rtol=0, atol=tolerance)
+
+    for source in [model, artifact]:
+        compiled = compile_svr(source, block_size=7) # several blocks and a partial last one
+        np.testing.assert_allclose(compiled.predict_values(testing[FILTER].to_numpy()), expected, rtol=0, atol=tolerance)
+        np.testing.assert_allclose(compiled.predict(testing).to_numpy(), expected, rtol=0, atol=tolerance)
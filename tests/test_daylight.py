@@ -0,0 +1,59 @@
+from predictors.daylight import SolarMask, LearnedMask, from_dict
+from predictors.svr_model import SVRModel
+from evaluation import backtest
+from importers import synthetic
+import numpy as np
+import pytest
+
+FILTER = ['airtemp', 'humidity']
+
+@pytest.fixture(scope='module')
+def data():
+    return synthetic.site(3, hours=24 * 120)
+
+def windows(data):
+    return data['20140301':'20140328'], data['20140329':'20140330']
+
+def leaked(data):
+    """
+    The data with power at every hour from the testing window on, a mask learned from it would have no night
+    """
+    changed = data.copy()
+    changed.loc['20140329':, 'power'] = 1e6
+    return changed
+
+def test_learned_mask_ignores_the_testing_window(data):
+    training, testing = windows(data)
+    masks = []
+    for base in [data, leaked(data)]:
+        model = SVRModel(base)
+        model.fit(training, filter=FILTER, daylight='learned')
+        masks.append(model.daylight.table)
+    np.testing.assert_array_equal(masks[0], masks[1])
+    assert not masks[0][testing.index.dayofyear[0] - 1].all() # the testing days have night hours
+
+def test_backtest_mask_ignores_the_testing_window(data):
+    training, testing = windows(data)
+    results = [backtest.svr_forecast(training, testing, base, filter=FILTER, daylight='learned') for base in [data, leaked(data)]]
+    np.testing.assert_array_equal(results[0][0].daylight.table, results[1][0].daylight.table)
+    zeros = [prediction.power.to_numpy() == 0 for _, prediction in results] # the scaler still uses the whole base data
+    np.testing.assert_array_equal(zeros[0], zeros[1])
+    assert zeros[0].sum() >= 16 # the nights of both testing days are exact zeros
+
+def test_learned_mask_uses_earlier_base_data(data):
+    training, _ = windows(data)
+    model = SVRModel(data['20140101':'20140131'])
+    model.fit(training, filter=FILTER, daylight='learned')
+    history = model.history(training)
+    assert history.index[0] == data.index[0]
+    assert history.index[len(history)-1] == training.index[len(training)-1]
+
+@pytest.mark.parametrize('mask', [SolarMask(**synthetic.location(3)), 'learned'])
+def test_no_productive_hour_is_masked(data, mask):
+    training, testing = windows(data)
+    model = SVRModel(data)
+    model.fit(training, filter=FILTER, daylight=mask, location=synthetic.location(3))
+    productive = data.power.to_numpy() > 0
+    assert not (productive & ~model.daylight(data.index))[:len(training) + len(testing) + 24 * 59].any()
+    restored = from_dict(model.daylight.to_dict())
+    np.testing.assert_array_equal(restored(data.index), model.daylight(data.index))
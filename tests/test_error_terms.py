@@ -0,0 +1,46 @@
+from evaluation import error_terms
+from sklearn.metrics import mean_absolute_error
+import pandas as pd
+import numpy as np
+import pytest
+
+SINGLE = {'mse': error_terms.mse, 'rmse': error_terms.rmse, 'nrmse': error_terms.nrmse, 'r2': error_terms.r2}
+
+@pytest.fixture(scope='module')
+def stacked():
+    """
+    Predictions of 4 sites x 3 windows with 10 to 48 hours, padded with NaN to 48 hours. The last window of
+    the last site has a truth with a mean close to zero, so its nrmse and r2 are out of bounds.
+    """
+    random = np.random.default_rng(0)
+    y_true = random.uniform(0, 1000, (4, 3, 48))
+    y_pred = y_true + random.normal(0, 100, y_true.shape)
+    y_true[3, 2] = random.normal(0, 1, 48)
+    lengths = random.integers(10, 49, (4, 3))
+    for site, window in np.ndindex(lengths.shape):
+        y_true[site, window, lengths[site, window]:] = np.nan
+        y_pred[site, window, lengths[site, window]:] = np.nan
+    return y_true, y_pred, lengths
+
+def test_matches_the_single_series_functions(stacked):
+    y_true, y_pred, lengths = stacked
+    results = error_terms.batch_errors(y_true, y_pred, decimals=2)
+    for site, window in np.ndindex(lengths.shape):
+        true_values = pd.Series(y_true[site, window, :lengths[site, window]])
+        predicted = pd.Series(y_pred[site, window, :lengths[site, window]])
+        for name, function in SINGLE.items():
+            try:
+                expected = function(true_values, predicted)
+            except RuntimeError: # out of bounds
+                expected = np.nan
+            np.testing.assert_allclose(results[name][site, window], expected, rtol=0, atol=1e-9, err_msg=f'{name} {site} {window}')
+        assert results['mae'][site, window] == pytest.approx(round(mean_absolute_error(true_values, predicted), 2), abs=1e-9)
+    assert np.isnan(results['nrmse'][3, 2]) and np.isnan(results['r2'][3, 2])
+
+def test_types(stacked):
+    y_true, y_pred, lengths = stacked
+    results = error_terms.batch_errors(y_true, y_pred)
+    assert all(isinstance(values, np.ndarray) and values.shape == (4, 3) for values in results.values())
+    single = error_terms.batch_errors(y_true[0, 0], y_pred[0, 0])
+    assert all(type(value) is float for value in single.values())
+    for name in single: assert single[name] == pytest.approx(results[name][0, 0], rel=1e-12)
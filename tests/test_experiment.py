@@ -0,0 +1,34 @@
+from evaluation import experiment
+import pandas as pd
+import pytest
+import os
+
+SPECS = os.path.join(os.path.dirname(__file__), '..', 'experiments')
+
+# windows of the second and third run scripts the generated windows replace
+WINDOWS_2014 = [
+    ['jan', ['20140104', '20140131', '20140201', '20140202']],
+    ['feb', ['20140201', '20140228', '20140301', '20140302']],
+    ['mar', ['20140304', '20140331', '20140401', '20140402']],
+    ['apr', ['20140403', '20140430', '20140501', '20140502']],
+    ['may', ['20140504', '20140531', '20140601', '20140602']],
+    ['jun', ['20140603', '20140630', '20140701', '20140702']],
+    ['jul', ['20140704', '20140731', '20140801', '20140802']],
+    ['aug', ['20140804', '20140831', '20140901', '20140902']],
+    ['sep', ['20140903', '20140930', '20141001', '20141002']],
+    ['oct', ['20141004', '20141031', '20141101', '20141102']],
+    ['nov', ['20141103', '20141130', '20141201', '20141202']],
+    ['dec', ['20141202', '20141229', '20141230', '20141231']],
+]
+
+def test_monthly_windows_match_the_scripts():
+    data = pd.DataFrame(index=pd.date_range('20140101', '20141231 23:00', freq='H'))
+    assert experiment.monthly_windows(data) == WINDOWS_2014
+    assert experiment.monthly_windows(data, months=['jan', 'jul']) == [WINDOWS_2014[0], WINDOWS_2014[6]]
+
+@pytest.mark.parametrize('name, year', [('first_run_uq', '2015'), ('first_run_pvwatts', '2019')])
+def test_first_run_windows_are_the_scripts_windows(name, year):
+    spec = experiment.load_spec(os.path.join(SPECS, f'{name}.json'))
+    windows = dict(spec['windows'])
+    assert len(windows) == 4
+    assert [dates[0] for dates in windows.values()] == [year + '0104', year + '0103', year + '0704', year + '1004']
@@ -0,0 +1,47 @@
+from predictors.arima_model import ARIMAModel, fourier_series, validate_fit_params, PERIOD
+from importers import synthetic
+import pandas as pd
+import numpy as np
+import pytest
+
+INDEX = pd.date_range('20140101', periods=7 * 24, freq='H')
+FILTER = ['airtemp', 'humidity']
+
+@pytest.mark.parametrize('harmonics', range(1, PERIOD // 2))
+def test_terms_are_linearly_independent(harmonics):
+    terms = fourier_series(INDEX, harmonics).to_numpy()
+    assert np.abs(terms).max(axis=0).min() > 0.5 # no column is zero
+    assert np.linalg.matrix_rank(np.column_stack([np.ones(len(INDEX)), terms])) == 2 * harmonics + 1
+
+@pytest.mark.parametrize('harmonics', [1, PERIOD // 2 - 1])
+def test_valid_fourier_terms(harmonics):
+    validate_fit_params((2,0,1), None, None, True, harmonics)
+
+@pytest.mark.parametrize('harmonics', [0, PERIOD // 2, PERIOD, 2.0])
+def test_invalid_fourier_terms(harmonics):
+    with pytest.raises(TypeError, match='fourier_terms'):
+        validate_fit_params((2,0,1), None, None, True, harmonics)
+
+@pytest.fixture(scope='module')
+def data():
+    return synthetic.site(1, hours=24 * 30)
+
+@pytest.mark.parametrize('use_exogenous', [True, False])
+def test_fit_uses_the_terms(data, use_exogenous):
+    training, testing = data.iloc[:24 * 28], data.iloc[24 * 28:]
+    model = ARIMAModel()
+    model.fit(training, order=(2,0,1), filter=FILTER if use_exogenous else None, use_exogenous=use_exogenous, fourier_terms=4)
+    results = model.model.arima_res_
+    terms = list(fourier_series(INDEX, 4).columns)
+    assert results.model.exog_names == (FILTER if use_exogenous else []) + terms
+    assert np.abs(results.params[:results.model.k_exog]).min() > 0
+
+    prediction = model.predict(testing_data=testing) if use_exogenous else model.predict(hours=48)
+    power = prediction.power.to_numpy()
+    np.testing.assert_allclose(model.predict_array(testing_data=testing, hours=48), power, rtol=0, atol=1e-6 * power.max())
+    # a (2,0,1) forecast without the terms decays to the mean within hours, with them the second day has a daily cycle
+    assert power[24:].max() > 0.5 * training.power.max()
+    assert np.corrcoef(power[:24], power[24:])[0, 1] > 0.9
+
+    rolling = model.rolling_forecast(testing, horizon=24, step=24)
+    np.testing.assert_allclose(rolling.power.to_numpy()[:24], power[:24], rtol=0, atol=1e-6 * power.max())
@@ -0,0 +1,71 @@
+import instrumentation
+import numpy as np
+import subprocess
+import pytest
+import sys
+import os
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+
+@pytest.fixture
+def events(tmp_path):
+    path = str(tmp_path / 'timings.jsonl')
+    instrumentation.enable(path)
+    yield lambda: instrumentation.read(path).set_index('stage')
+    instrumentation.disable()
+
+def allocate(megabytes):
+    values = np.ones(megabytes * 2**20 // 8) # touched, so it is resident
+    return float(values.sum())
+
+def test_nested_stages(events):
+    with instrumentation.stage('cell', site='car_2014', window='jan', model='svr'):
+        with instrumentation.stage('fit') as fit:
+            fit.record(iterations=3)
+    recorded = events()
+    assert recorded.loc['fit', 'parent'] == 'cell'
+    assert recorded.loc['fit', 'site'] == 'car_2014'
+    assert recorded.loc['fit', 'iterations'] == 3
+    assert not recorded.loc['fit', 'failed']
+
+@pytest.mark.skipif(not instrumentation.reset_peak_rss(), reason='the peak memory can only be reset on linux')
+def test_peak_memory_per_stage(events):
+    with instrumentation.stage('outer'):
+        with instrumentation.stage('large'):
+            allocate(200)
+        with instrumentation.stage('small'):
+            allocate(10)
+    recorded = events()
+    assert recorded.loc['large', 'peak_rss_growth_mb'] > 150
+    assert recorded.loc['small', 'peak_rss_growth_mb'] < 50 # not the peak of the stage before
+    assert recorded.loc['small', 'peak_rss_mb'] < recorded.loc['large', 'peak_rss_mb'] - 100
+    assert recorded.loc['outer', 'peak_rss_mb'] >= recorded.loc['large', 'peak_rss_mb']
+
+def test_disabled_stage_records_nothing(tmp_path):
+    assert not instrumentation.enabled()
+    with instrumentation.stage('fit') as fit:
+        fit.record(iterations=3)
+    assert fit is instrumentation._DISABLED
+
+def test_core_modules_import_without_resource():
+    # windows has no resource module, the loaders and models must not depend on it or on the evaluation package
+    script = ("import sys; sys.modules['resource'] = None\n"
+              "import importers.uq, importers.pvwatts, predictors.svr_model, predictors.arima_model, instrumentation\n"
+              "assert not [name for name in sys.modules if name.startswith('evaluation')]\n"
+              "assert instrumentation.peak_rss_mb() is None\n"
+              "import benchmark_suite\n")
+    subprocess.run([sys.executable, '-c', script], cwd=ROOT, check=True)
+
+def test_process_peak_without_reset(tmp_path, monkeypatch):
+    monkeypatch.setattr(instrumentation, 'reset_peak_rss', lambda: False)
+    path = str(tmp_path / 'timings.jsonl')
+    instrumentation.enable(path)
+    try:
+        with instrumentation.stage('fit'): pass
+    finally:
+        instrumentation.disable()
+    recorded = instrumentation.read(path)
+    assert 'peak_rss_mb' not in recorded.columns # it is not the peak of the stage
+    assert recorded.process_peak_rss_mb[0] > 0
+    stages, _ = instrumentation.summary(recorded)
+    assert 'process_peak_rss_mb' in stages.columns
@@ -0,0 +1,120 @@
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+from importers.response_cache import ResponseCache
+from importers import synthetic
+import importlib
+import threading
+import requests
+import pytest
+import json
+import time
+import os
+
+RESPONSE = synthetic.pvwatts_response(synthetic.site(hours=48, layout='pvwatts'), city='Fake City')
+
+class FakePVWatts(BaseHTTPRequestHandler):
+    """
+    Answers like the PVWatts API: the intl dataset is not available, tmy3 returns RESPONSE
+    """
+    def do_GET(self):
+        params = {key: values[0] for key, values in parse_qs(urlparse(self.path).query).items()}
+        self.server.requests.append(params)
+        if params['dataset'] == 'intl':
+            status, document = 422, {'errors': ['No intl data at this location'], 'warnings': []}
+        else:
+            status, document = 200, RESPONSE
+        body = json.dumps(document).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakePVWatts)
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def pvwatts(server, tmp_path, monkeypatch):
+    """
+    pvwatts importer pointed at the fake server through PVWATTS_API_URL, with an empty cache
+    """
+    monkeypatch.setenv('PVWATTS_API_URL', f'http://127.0.0.1:{server.server_address[1]}/api/pvwatts/v6.json')
+    monkeypatch.setenv('PVWATTS_CACHE_DIR', str(tmp_path / 'cache'))
+    monkeypatch.delenv('PVWATTS_OFFLINE', raising=False)
+    from importers import pvwatts
+    module = importlib.reload(pvwatts)
+    yield module
+    monkeypatch.undo()
+    importlib.reload(pvwatts)
+
+def test_uses_api_url(pvwatts, server):
+    data = pvwatts.load(dataset='tmy3')
+    assert len(server.requests) == 1
+    assert list(data.columns) == ['tamb', 'wspd', 'power']
+    assert len(data) == 48
+
+def test_cache_hit(pvwatts, server):
+    first = pvwatts.load(dataset='tmy3')
+    second = pvwatts.load(dataset='tmy3')
+    assert len(server.requests) == 1
+    assert first.equals(second)
+
+def test_api_key_is_not_part_of_the_key(pvwatts, server, monkeypatch):
+    monkeypatch.setattr(pvwatts, 'API_KEY', 'first-key')
+    pvwatts.load(dataset='tmy3')
+    monkeypatch.setattr(pvwatts, 'API_KEY', 'second-key')
+    pvwatts.load(dataset='tmy3')
+    assert len(server.requests) == 1
+    assert server.requests[0]['api_key'] == 'first-key'
+
+def test_ttl_expiry(pvwatts, server, tmp_path):
+    pvwatts.CACHE = ResponseCache(str(tmp_path / 'ttl'), ttl=60)
+    pvwatts.load(dataset='tmy3')
+    pvwatts.load(dataset='tmy3')
+    assert len(server.requests) == 1
+    for name in os.listdir(tmp_path / 'ttl'):
+        path = tmp_path / 'ttl' / name
+        os.utime(path, (time.time(), time.time() - 120)) # stored two minutes ago
+    pvwatts.load(dataset='tmy3')
+    assert len(server.requests) == 2
+
+def test_offline_mode(pvwatts, server, tmp_path):
+    pvwatts.load(dataset='tmy3')
+    pvwatts.CACHE = ResponseCache(str(tmp_path / 'cache'), offline=True)
+    assert len(pvwatts.load(dataset='tmy3')) == 48
+    with pytest.raises(RuntimeError):
+        pvwatts.load(dataset='tmy3', lat=0.0)
+    assert len(server.requests) == 1
+
+def test_intl_failure_is_cached(pvwatts, server):
+    with pytest.raises(requests.HTTPError):
+        pvwatts.load(dataset='intl')
+    with pytest.raises(requests.HTTPError) as error:
+        pvwatts.load(dataset='intl')
+    assert error.value.response.status_code == 422
+    assert len(server.requests) == 1
+
+def test_bulk_load_fallback_without_requests_on_rerun(pvwatts, server, tmp_path):
+    stations = [('Fake City', 10.0, 20.0)]
+    cities, failures = pvwatts.bulk_load(stations, workers=1, retries=0)
+    assert list(cities) == ['Fake City'] and not failures
+    assert [params['dataset'] for params in server.requests] == ['intl', 'tmy3']
+
+    cities, failures = pvwatts.bulk_load(stations, workers=1, retries=0)
+    assert list(cities) == ['Fake City'] and not failures
+    assert len(server.requests) == 2
+
+    pvwatts.CACHE = ResponseCache(str(tmp_path / 'cache'), offline=True)
+    cities, failures = pvwatts.bulk_load(stations, workers=1, retries=0)
+    assert list(cities) == ['Fake City'] and not failures
+    assert len(server.requests) == 2
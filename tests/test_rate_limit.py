@@ -0,0 +1,38 @@
+from importers.rate_limit import TokenBucket
+from importers import pvwatts
+import numpy as np
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += max(seconds, 1e-6) # a real sleep always takes some time, rounding errors can leave tiny waits
+
+def requests_per_hour(times):
+    times = np.asarray(times)
+    return (np.searchsorted(times, times + 3600, side='left') - np.arange(len(times))).max()
+
+def test_bulk_load_stays_within_the_hourly_quota(monkeypatch):
+    created = []
+    monkeypatch.setattr(pvwatts, 'TokenBucket', lambda **arguments: created.append(arguments) or TokenBucket(**arguments))
+    pvwatts.bulk_load([])
+    clock = FakeClock()
+    limiter = TokenBucket(**created[0], clock=clock, sleep=clock.sleep)
+    times = []
+    while clock.now < 3 * 3600:
+        limiter.acquire()
+        times.append(clock.now)
+    assert requests_per_hour(times) <= pvwatts.RATE_LIMIT
+    assert len(times) >= 3 * pvwatts.RATE_LIMIT - 3 * pvwatts.BURST # the quota is still used
+
+def test_drain():
+    clock = FakeClock()
+    limiter = TokenBucket(rate=1, capacity=5, clock=clock, sleep=clock.sleep)
+    limiter.acquire()
+    limiter.drain()
+    limiter.acquire()
+    assert clock.now == 1
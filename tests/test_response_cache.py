@@ -0,0 +1,67 @@
+from importers.response_cache import ResponseCache
+import inspect
+import time
+import os
+
+PARAMS = {'lat': -27.5, 'lon': 153.0, 'system_capacity': 4, 'api_key': 'first-key'}
+
+def test_default_ignore_is_immutable():
+    assert isinstance(inspect.signature(ResponseCache).parameters['ignore'].default, tuple)
+
+def test_key():
+    cache = ResponseCache('unused')
+    key = cache.key(PARAMS)
+    assert cache.key(dict(PARAMS, api_key='second-key')) == key
+    assert cache.key(dict(reversed(list(PARAMS.items())))) == key
+    assert cache.key(dict(PARAMS, tilt=None)) == key
+    assert cache.key(dict(PARAMS, system_capacity='4')) == key
+    assert cache.key(dict(PARAMS, lat=-27.6)) != key
+    assert ResponseCache('unused', ignore=()).key(dict(PARAMS, api_key='second-key')) != ResponseCache('unused', ignore=()).key(PARAMS)
+    assert ResponseCache('unused', ignore=['api_key', 'lon']).key(dict(PARAMS, lon=0)) == ResponseCache('unused', ignore=['api_key', 'lon']).key(PARAMS)
+
+def test_get_and_put(tmp_path):
+    cache = ResponseCache(str(tmp_path / 'cache'))
+    assert cache.get(PARAMS) is None
+    cache.put(PARAMS, {'outputs': [1, 2, 3]})
+    assert cache.get(dict(PARAMS, api_key='second-key')) == {'outputs': [1, 2, 3]}
+    assert cache.get(dict(PARAMS, lat=0)) is None
+    with open(cache.path(PARAMS), 'wb') as file:
+        file.write(b'partial')
+    assert cache.get(PARAMS) is None
+    assert not os.path.exists(cache.path(PARAMS))
+
+def test_ttl_expiry(tmp_path):
+    cache = ResponseCache(str(tmp_path / 'cache'), ttl=60)
+    cache.put(PARAMS, {'outputs': []})
+    stored = time.time() - 30
+    os.utime(cache.path(PARAMS), (stored, stored))
+    assert cache.get(PARAMS) == {'outputs': []}
+    assert os.stat(cache.path(PARAMS)).st_mtime == stored # reading does not extend the ttl
+    stored = time.time() - 120
+    os.utime(cache.path(PARAMS), (stored, stored))
+    assert cache.get(PARAMS) is None
+    assert not os.path.exists(cache.path(PARAMS))
+    assert ResponseCache(str(tmp_path / 'never')).ttl is None
+
+def test_lru_eviction(tmp_path):
+    cache = ResponseCache(str(tmp_path / 'cache'))
+    sites = [dict(PARAMS, lat=float(lat)) for lat in range(4)]
+    for index, params in enumerate(sites[:3]):
+        cache.put(params, {'outputs': [index] * 100})
+        used = time.time() - 1000 + index # stored in this order, oldest first
+        os.utime(cache.path(params), (used, used))
+    size = os.path.getsize(cache.path(sites[0]))
+    assert cache.get(sites[0]) is not None # now the most recently used
+    cache.max_size = 3 * size
+    cache.put(sites[3], {'outputs': [3] * 100})
+    assert [cache.get(params) is not None for params in sites] == [True, False, True, True]
+    cache.max_size = 0
+    cache.evict()
+    assert os.listdir(tmp_path / 'cache') == []
+
+def test_clear(tmp_path):
+    cache = ResponseCache(str(tmp_path / 'cache'))
+    cache.clear()
+    cache.put(PARAMS, {'outputs': []})
+    cache.clear()
+    assert cache.get(PARAMS) is None
@@ -0,0 +1,57 @@
+from features import solar
+import pandas as pd
+import numpy as np
+import pytest
+
+INDEX = pd.date_range('20140101', '20141231 23:00', freq='H')
+
+@pytest.fixture(scope='module')
+def sites():
+    random = np.random.default_rng(0)
+    return random.uniform(-60, 60, 200), random.uniform(-180, 180, 200)
+
+def reference(index, latitude, longitude, utc_offset, shift=0.5):
+    """
+    Zenith and azimuth in degrees with the series of Spencer evaluated for every site and hour
+    """
+    minutes = index.hour.values * 60 + index.minute.values + shift * 60
+    days = index.dayofyear.values - 1 + (minutes - utc_offset[:, np.newaxis] * 60) / 1440
+    equation_of_time, declination, _ = solar._spencer(2 * np.pi * days / 365)
+    hour_angle = np.radians((minutes + equation_of_time - utc_offset[:, np.newaxis] * 60 + 4 * longitude[:, np.newaxis]) / 4) - np.pi
+    latitude = np.radians(latitude)[:, np.newaxis]
+    cosz = np.sin(latitude) * np.sin(declination) + np.cos(latitude) * np.cos(declination) * np.cos(hour_angle)
+    azimuth = np.arctan2(np.sin(hour_angle) * np.cos(declination), np.cos(hour_angle) * np.sin(latitude) * np.cos(declination) - np.sin(declination) * np.cos(latitude))
+    return np.degrees(np.arccos(np.clip(cosz, -1, 1))), np.mod(np.degrees(azimuth) + 180, 360)
+
+def angle_difference(first, second):
+    difference = np.abs(first - second) % 360
+    return np.minimum(difference, 360 - difference)
+
+@pytest.mark.parametrize('offsets', ['solar', 'rounded'])
+def test_position_matches_the_reference(sites, offsets):
+    latitude, longitude = sites
+    utc_offset = longitude / 15 if offsets == 'solar' else np.round(longitude / 15)
+    zenith, azimuth = solar.solar_position(INDEX, latitude, longitude, utc_offset)
+    expected_zenith, expected_azimuth = reference(INDEX, latitude, longitude, utc_offset)
+    assert np.abs(zenith - expected_zenith).max() < 0.003
+    # the azimuth is ill-conditioned with the sun near the zenith, so the arc on the sky is compared
+    assert (angle_difference(azimuth, expected_azimuth) * np.sin(np.radians(expected_zenith))).max() < 0.003
+    np.testing.assert_allclose(solar.cos_zenith(INDEX, latitude, longitude, utc_offset), np.cos(np.radians(zenith)), atol=1e-12)
+
+def test_features_match_the_single_functions(sites):
+    latitude, longitude = sites
+    features = solar.solar_features(INDEX, latitude, longitude)
+    zenith, azimuth = solar.solar_position(INDEX, latitude, longitude)
+    np.testing.assert_array_equal(features['solar_zenith'], zenith)
+    np.testing.assert_array_equal(features['solar_azimuth'], azimuth)
+    np.testing.assert_array_equal(features['clear_sky'], solar.clear_sky(INDEX, latitude, longitude))
+    assert features['clear_sky'].min() == 0
+    assert list(solar.solar_features(INDEX, latitude, longitude, features=['clear_sky'])) == ['clear_sky']
+
+def test_single_site_and_time_zone():
+    local = solar.add_solar_features(pd.DataFrame(index=INDEX), -27.4975, 153.0137, utc_offset=10)
+    aware = solar.add_solar_features(pd.DataFrame(index=INDEX.tz_localize('Etc/GMT-10')), -27.4975, 153.0137)
+    for feature in solar.FEATURES:
+        np.testing.assert_allclose(aware[feature].to_numpy(), local[feature].to_numpy(), atol=1e-9)
+    noon = local.solar_zenith.groupby(local.index.hour).mean().idxmin()
+    assert noon in [11, 12]
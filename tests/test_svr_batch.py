@@ -0,0 +1,20 @@
+from predictors.svr_model import SVRModel, SVRBatch
+from importers import synthetic
+import numpy as np
+import pytest
+
+@pytest.fixture(scope='module')
+def data():
+    data = synthetic.site(1, hours=24 * 30)
+    return data[['power', 'airtemp', 'humidity']] # power is not the last column
+
+@pytest.mark.parametrize('scaling', [True, False])
+def test_matches_svr_model_without_filter(data, scaling):
+    cells = {'first': (data.iloc[:24 * 14], data.iloc[24 * 14:24 * 16]), 'second': (data.iloc[24 * 14:24 * 28], data.iloc[24 * 28:])}
+    prediction = SVRBatch(scaling=scaling, workers=1).run(cells, base_data=data if scaling else None)
+    for key, (training, testing) in cells.items():
+        model = SVRModel(data if scaling else None, scaling=scaling)
+        model.fit(training)
+        expected = model.predict(testing).power.to_numpy()
+        # the scaler columns are in another order, libsvm stops within its tolerance of the same solution
+        np.testing.assert_allclose(prediction[prediction.cell == key].power.to_numpy(), expected, atol=1e-3 * expected.max())
@@ -0,0 +1,67 @@
+from importers import uq, synthetic
+import pandas as pd
+import numpy as np
+import pytest
+import os
+
+def write(directory, hours=48, minutes=10, number=1):
+    power_file, weather_file = str(directory / 'power.csv'), str(directory / 'weather.csv')
+    synthetic.write_uq_files(synthetic.site(number, hours=hours), power_file, weather_file, minutes=minutes)
+    return power_file, weather_file
+
+def duplicate_rows(filepath, positions):
+    with open(filepath) as file: lines = file.readlines()
+    for position in sorted(positions, reverse=True): lines.insert(position, lines[position])
+    with open(filepath, 'w') as file: file.writelines(lines)
+
+@pytest.fixture(scope='module')
+def files(tmp_path_factory):
+    power_file, weather_file = write(tmp_path_factory.mktemp('uq'))
+    duplicate_rows(weather_file, [1, 7, 100, 101]) # duplicates of the first row, inside and across chunks
+    return power_file, weather_file
+
+@pytest.mark.parametrize('chunksize', [1, 5, 6, 7, 59, 100, 100000])
+@pytest.mark.parametrize('with_insolation', [False, True])
+def test_chunks_match_the_complete_files(files, chunksize, with_insolation):
+    expected = uq.load(*files, with_insolation=with_insolation, use_cache=False)
+    chunked = uq.load(*files, with_insolation=with_insolation, use_cache=False, chunksize=chunksize)
+    assert len(expected) == 48
+    pd.testing.assert_frame_equal(chunked, expected, check_freq=False)
+
+def test_chunks_of_minute_data(tmp_path):
+    files = write(tmp_path, hours=30, minutes=1, number=2)
+    pd.testing.assert_frame_equal(uq.load(*files, use_cache=False, chunksize=1000), uq.load(*files, use_cache=False), check_freq=False)
+
+def test_unsorted_files_are_rejected(tmp_path):
+    power_file, weather_file = write(tmp_path)
+    with open(weather_file) as file: lines = file.readlines()
+    lines[5], lines[6] = lines[6], lines[5]
+    with open(weather_file, 'w') as file: file.writelines(lines)
+    with pytest.raises(pd.errors.ParserError, match='sorted'):
+        uq.load(power_file, weather_file, use_cache=False, chunksize=10)
+
+def test_cache_is_invalidated_by_changed_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(uq, 'CACHE_DIR', str(tmp_path / 'cache'))
+    power_file, weather_file = write(tmp_path)
+    first = uq.load(power_file, weather_file)
+    assert len(os.listdir(uq.CACHE_DIR)) == 1
+
+    def unexpected(filepath): raise AssertionError(f'{filepath} was parsed instead of using the cache')
+    with monkeypatch.context() as patched:
+        patched.setattr(uq, 'read_csv', unexpected)
+        pd.testing.assert_frame_equal(uq.load(power_file, weather_file), first, check_freq=False)
+
+    stat = os.stat(power_file) # same content, newer modification time
+    os.utime(power_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    pd.testing.assert_frame_equal(uq.load(power_file, weather_file), first, check_freq=False)
+    assert len(os.listdir(uq.CACHE_DIR)) == 2
+
+    with open(power_file) as file: lines = file.readlines()
+    header, rows = lines[0], lines[1:]
+    time, power, energy = rows[len(rows) // 2].strip().split(',')
+    rows[len(rows) // 2] = f'{time},{float(power) + 12345},{energy}\n' # another size
+    with open(power_file, 'w') as file: file.writelines([header] + rows)
+    changed = uq.load(power_file, weather_file)
+    assert len(os.listdir(uq.CACHE_DIR)) == 3
+    assert changed.power.sum() > first.power.sum()
+    pd.testing.assert_frame_equal(uq.load(power_file, weather_file), changed, check_freq=False)